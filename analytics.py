@@ -0,0 +1,374 @@
+import hashlib
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+_MASK64 = (1 << 64) - 1
+
+
+def hash64(item):
+    """Stable 64-bit hash of a string"""
+    return int.from_bytes(hashlib.blake2b(item.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class HyperLogLog:
+    """Approximate distinct count in 2**precision bytes (about 1.04 / sqrt(2**precision) error)"""
+
+    def __init__(self, precision=10):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_hash(self, value):
+        index = value >> (64 - self.precision)
+        rest = (value << self.precision) & _MASK64
+        # Position of the first set bit in the remaining bits
+        rank = 64 - self.precision + 1 if rest == 0 else 65 - rest.bit_length()
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def add(self, item):
+        self.add_hash(hash64(item))
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int32)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Small range correction (linear counting)
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+    def clear(self):
+        self.registers.fill(0)
+
+
+class CountMinSketch:
+    """Approximate frequencies, never under-estimated, in width x depth counters"""
+
+    def __init__(self, width=1024, depth=4):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int32)
+        # Flat view for per-item updates, scalar indexing is much cheaper than fancy indexing
+        self._flat = self.table.reshape(-1)
+
+    @staticmethod
+    def dimensions(epsilon, delta):
+        """
+        (width, depth) for estimates that exceed the true count by at most
+        epsilon * total count, with probability 1 - delta
+        """
+        if not 0 < epsilon < 1 or not 0 < delta < 1:
+            raise ValueError("epsilon and delta must be in (0, 1)")
+        return int(math.ceil(math.e / epsilon)), int(math.ceil(math.log(1 / delta)))
+
+    def cells(self, value):
+        """Flat table index of the counter in each row for a hash"""
+        # Double hashing: depth indices from the two halves of one 64-bit hash
+        h1, h2 = value & 0xFFFFFFFF, (value >> 32) | 1
+        return [row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add_hash(self, value, count=1):
+        flat = self._flat
+        for cell in self.cells(value):
+            flat[cell] += count
+
+    def estimate_hash(self, value):
+        flat = self._flat
+        return int(min(flat[cell] for cell in self.cells(value)))
+
+    def add(self, item, count=1):
+        self.add_hash(hash64(item), count)
+
+    def estimate(self, item):
+        return self.estimate_hash(hash64(item))
+
+    def merge(self, other):
+        self.table += other.table
+
+    def subtract(self, other):
+        self.table -= other.table
+
+    def clear(self):
+        self.table.fill(0)
+
+
+class BloomFilter:
+    """Set membership in a bit array: no false negatives, false positives at a rate set by its size"""
+
+    def __init__(self, bits=1 << 14, hashes=7):
+        self.bits = bits
+        self.hashes = hashes
+        self.array = np.zeros(bits, dtype=bool)
+
+    @staticmethod
+    def dimensions(capacity, error_rate):
+        """(bits, hashes) for a false positive rate of error_rate once capacity items are added"""
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be in (0, 1)")
+        capacity = max(1, capacity)
+        bits = max(64, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        return bits, max(1, int(round(bits / capacity * math.log(2))))
+
+    def positions(self, value):
+        """Bit index of each hash function for a hash, by double hashing like CountMinSketch"""
+        h1, h2 = value & 0xFFFFFFFF, (value >> 32) | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def add_hash(self, value):
+        self.array[self.positions(value)] = True
+
+    def contains_positions(self, positions):
+        array = self.array
+        return all(array[position] for position in positions)
+
+    def contains_hash(self, value):
+        return self.contains_positions(self.positions(value))
+
+    def clear(self):
+        self.array.fill(False)
+
+
+class _Bucket:
+    """Aggregates of the sightings in one time slice"""
+
+    def __init__(self, precision, cms_width, cms_depth, bloom_bits, bloom_hashes):
+        self.index = None
+        self.sightings = 0
+        self.unique = HyperLogLog(precision)
+        self.repeats = HyperLogLog(precision)
+        self.frequencies = CountMinSketch(cms_width, cms_depth)
+        # Plates seen in this bucket, for repeat visitor checks
+        self.seen = BloomFilter(bloom_bits, bloom_hashes)
+        self.states = Counter()
+        # Heavy-hitter candidates for top-N, frequencies come from the sketches
+        self.candidates = Counter()
+
+    def reset(self, index):
+        self.index = index
+        self.sightings = 0
+        self.unique.clear()
+        self.repeats.clear()
+        self.frequencies.clear()
+        self.seen.clear()
+        self.states.clear()
+        self.candidates.clear()
+
+
+class SlidingWindow:
+    """
+    Aggregates over the last window_s seconds, in a ring of bucket_s buckets.
+    Memory does not depend on the number of sightings.
+    """
+
+    def __init__(self, window_s, bucket_s, precision=10, cms_width=1024, cms_depth=4, max_candidates=64,
+                 bloom_bits=1 << 14, bloom_hashes=7):
+        if window_s < bucket_s:
+            raise ValueError("window_s must be at least bucket_s")
+        self.window_s = window_s
+        self.bucket_s = bucket_s
+        self.max_candidates = max_candidates
+        self.buckets = [_Bucket(precision, cms_width, cms_depth, bloom_bits, bloom_hashes)
+                        for _ in range(int(round(window_s / bucket_s)))]
+        # Sum of the live buckets' frequency sketches, kept up to date as buckets expire
+        self.frequencies = CountMinSketch(cms_width, cms_depth)
+
+    def _expire(self, now):
+        """Reset buckets that have left the window ending at now"""
+        oldest = int(now // self.bucket_s) - len(self.buckets)
+        for bucket in self.buckets:
+            if bucket.index is not None and bucket.index <= oldest:
+                self._reset(bucket, None)
+
+    def _reset(self, bucket, index):
+        if bucket.sightings:
+            self.frequencies.subtract(bucket.frequencies)
+        bucket.reset(index)
+
+    def _bucket(self, timestamp):
+        index = int(timestamp // self.bucket_s)
+        bucket = self.buckets[index % len(self.buckets)]
+        if bucket.index != index:
+            self._reset(bucket, index)
+        return bucket
+
+    def _live(self, now):
+        """Buckets inside the window ending at now"""
+        newest = int(now // self.bucket_s)
+        return [b for b in self.buckets if b.index is not None and newest - len(self.buckets) < b.index <= newest]
+
+    def seen_before(self, value, timestamp):
+        """True if the plate was probably seen in an earlier bucket of the window"""
+        self._expire(timestamp)
+        index = int(timestamp // self.bucket_s)
+        positions = self.buckets[0].seen.positions(value)
+        return any(bucket.seen.contains_positions(positions) for bucket in self.buckets
+                   if bucket.index is not None and bucket.index < index)
+
+    def add(self, plate, value, timestamp, state=None, repeat=False):
+        self._expire(timestamp)
+        bucket = self._bucket(timestamp)
+        bucket.sightings += 1
+        bucket.unique.add_hash(value)
+        bucket.frequencies.add_hash(value)
+        bucket.seen.add_hash(value)
+        self.frequencies.add_hash(value)
+        if repeat:
+            bucket.repeats.add_hash(value)
+        if state:
+            bucket.states[state] += 1
+        bucket.candidates[plate] += 1
+        if len(bucket.candidates) > 2 * self.max_candidates:
+            # Keep the most frequent half
+            bucket.candidates = Counter(dict(bucket.candidates.most_common(self.max_candidates)))
+
+    def unique_plates(self, now):
+        merged = HyperLogLog(self.buckets[0].unique.precision)
+        for bucket in self._live(now):
+            merged.merge(bucket.unique)
+        return merged.count()
+
+    def repeat_visitors(self, now):
+        merged = HyperLogLog(self.buckets[0].repeats.precision)
+        for bucket in self._live(now):
+            merged.merge(bucket.repeats)
+        return merged.count()
+
+    def sightings(self, now):
+        return sum(bucket.sightings for bucket in self._live(now))
+
+    def state_counts(self, now):
+        counts = Counter()
+        for bucket in self._live(now):
+            counts.update(bucket.states)
+        return counts
+
+    def top_plates(self, now, n=10):
+        self._expire(now)
+        candidates = set()
+        for bucket in self._live(now):
+            candidates.update(bucket.candidates)
+        scored = [(self.frequencies.estimate(plate), plate) for plate in candidates]
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [(plate, count) for count, plate in scored[:n]]
+
+
+class SightingAnalytics:
+    """
+    Streaming statistics over plate sightings, in bounded memory.
+
+    Keeps a one minute window (5 s buckets) and a one hour window (1 min
+    buckets) of HyperLogLog distinct counts, Count-Min frequencies, per-state
+    counts and top-N candidates. A repeat visitor is a plate seen again in a
+    later bucket of the hour window. Sightings that carry a track_id are
+    counted once per (stream, track).
+
+    The sketches are sized for expected_plates distinct plates per hour:
+    - a plate seen for the first time is reported as a repeat visitor with
+      probability at most repeat_error (per-bucket Bloom filters, no false
+      negatives); the rate grows when traffic exceeds expected_plates
+    - top_plates counts are never under-estimated and exceed the true count by
+      at most count_error * sightings in the window, with probability
+      count_confidence (Count-Min)
+    """
+
+    WINDOWS = {'minute': (60, 5), 'hour': (3600, 60)}
+
+    def __init__(self, state_mapper=None, precision=10, max_tracks=4096, expected_plates=50000,
+                 repeat_error=0.01, count_error=5e-4, count_confidence=0.98):
+        if expected_plates < 1:
+            raise ValueError("expected_plates must be at least 1")
+        self.state_mapper = state_mapper
+        cms_width, cms_depth = CountMinSketch.dimensions(count_error, 1 - count_confidence)
+        self.windows = {}
+        for name, (window_s, bucket_s) in self.WINDOWS.items():
+            # Each bucket holds its share of the hour's plates, and a new plate is
+            # checked against every other bucket, so they split the error rate
+            buckets = int(round(window_s / bucket_s))
+            bloom_bits, bloom_hashes = BloomFilter.dimensions(expected_plates * bucket_s / 3600,
+                                                              repeat_error / max(1, buckets - 1))
+            self.windows[name] = SlidingWindow(window_s, bucket_s, precision, cms_width, cms_depth,
+                                               bloom_bits=bloom_bits, bloom_hashes=bloom_hashes)
+        self.total_sightings = 0
+        self.last_timestamp = None
+        self._tracks = OrderedDict()
+        self._max_tracks = max_tracks
+        self._lock = threading.Lock()
+
+    def add(self, plate, timestamp=None, state=None, stream=None, track_id=None):
+        """Record one sighting, returns True if the plate is a repeat visitor"""
+        if not plate:
+            return False
+        timestamp = time.time() if timestamp is None else timestamp
+        if state is None and self.state_mapper is not None:
+            state = self.state_mapper.get_location_info(plate)['state']
+        value = hash64(plate)
+
+        with self._lock:
+            if track_id is not None:
+                key = (stream, track_id, plate)
+                if key in self._tracks:
+                    self._tracks.move_to_end(key)
+                    return False
+                self._tracks[key] = True
+                if len(self._tracks) > self._max_tracks:
+                    self._tracks.popitem(last=False)
+
+            repeat = self.windows['hour'].seen_before(value, timestamp)
+            for window in self.windows.values():
+                window.add(plate, value, timestamp, state, repeat)
+            self.total_sightings += 1
+            if self.last_timestamp is None or timestamp > self.last_timestamp:
+                self.last_timestamp = timestamp
+        return repeat
+
+    def add_detections(self, detections, timestamp=None, stream=None):
+        """Record the detections of one frame (those with text)"""
+        for detection in detections:
+            self.add(detection.get('text'), timestamp, detection.get('state'), stream,
+                     detection.get('track_id'))
+
+    def _now(self, now):
+        if now is not None:
+            return now
+        return time.time() if self.last_timestamp is None else max(time.time(), self.last_timestamp)
+
+    def unique_plates(self, window='minute', now=None):
+        with self._lock:
+            return self.windows[window].unique_plates(self._now(now))
+
+    def repeat_visitors(self, window='hour', now=None):
+        with self._lock:
+            return self.windows[window].repeat_visitors(self._now(now))
+
+    def state_counts(self, window='hour', now=None):
+        with self._lock:
+            return dict(self.windows[window].state_counts(self._now(now)).most_common())
+
+    def top_plates(self, n=10, window='hour', now=None):
+        with self._lock:
+            return self.windows[window].top_plates(self._now(now), n)
+
+    def summary(self, n=10, now=None):
+        """All aggregates as a plain dict"""
+        with self._lock:
+            now = self._now(now)
+            summary = {'total_sightings': self.total_sightings}
+            for name, window in self.windows.items():
+                summary[name] = {
+                    'sightings': window.sightings(now),
+                    'unique_plates': window.unique_plates(now),
+                    'repeat_visitors': window.repeat_visitors(now),
+                    'states': dict(window.state_counts(now).most_common()),
+                    'top_plates': window.top_plates(now, n)
+                }
+            return summary
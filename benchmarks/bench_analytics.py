@@ -0,0 +1,97 @@
+"""
+Accuracy check of the sighting analytics at realistic traffic: false repeat
+visitors among plates seen once, and the over-count of top_plates.
+
+Run from the repository root:
+    python -m benchmarks.bench_analytics
+    python -m benchmarks.bench_analytics --expected-plates 50000 --repeat-error 0.01
+
+Exits with status 1 when the false repeat rate of a scenario exceeds
+--repeat-error or a top_plates count exceeds its Count-Min bound.
+"""
+import argparse
+import json
+import sys
+import time
+
+from analytics import SightingAnalytics
+
+# (distinct plates seen once, seconds between sightings, plates seen four times)
+SCENARIOS = {
+    'busy_road': (20000, 0.1, 50),
+    'car_park': (3000, 1.0, 50),
+}
+
+
+def plate(i, series='AB'):
+    return f"KA{(i // 10000) % 100:02d}{series}{i % 10000:04d}"
+
+
+def run_scenario(distinct, interval_s, regulars, args):
+    analytics = SightingAnalytics(expected_plates=args.expected_plates, repeat_error=args.repeat_error,
+                                  count_error=args.count_error)
+    start = 1_000_000.0
+    false_repeats = 0
+    timestamp = start
+    started = time.perf_counter()
+    for i in range(distinct):
+        timestamp = start + i * interval_s
+        if analytics.add(plate(i), timestamp, state='Karnataka'):
+            false_repeats += 1
+        # Regulars come back four times, spread over the run
+        if i % max(1, distinct // 4) < regulars:
+            analytics.add(plate(i % max(1, distinct // 4), 'ZZ'), timestamp, state='Karnataka')
+    elapsed = time.perf_counter() - started
+
+    # Scenarios fit in the hour window: regulars were seen four times, other plates once
+    top = analytics.top_plates(n=10, now=timestamp)
+    sightings = analytics.windows['hour'].sightings(timestamp)
+    overcount = max((count - (4 if name[4:6] == 'ZZ' else 1) for name, count in top), default=0)
+    return {
+        'sightings': analytics.total_sightings,
+        'false_repeats': false_repeats,
+        'false_repeat_rate': round(false_repeats / distinct, 5),
+        'repeat_visitors_hour': analytics.repeat_visitors(now=timestamp),
+        'top_plate_counts': [count for _, count in top],
+        'max_overcount': overcount,
+        'overcount_bound': args.count_error * sightings,
+        'us_per_sighting': round(elapsed / analytics.total_sightings * 1e6, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the error of the sighting analytics sketches")
+    parser.add_argument('--expected-plates', type=int, default=50000, help="Distinct plates per hour to size for")
+    parser.add_argument('--repeat-error', type=float, default=0.01, help="Allowed false repeat visitor rate")
+    parser.add_argument('--count-error', type=float, default=5e-4,
+                        help="Allowed top_plates over-count, relative to the window's sightings")
+    parser.add_argument('-o', '--output', help="Write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    failed = False
+    for name, (distinct, interval_s, regulars) in SCENARIOS.items():
+        results[name] = stats = run_scenario(distinct, interval_s, regulars, args)
+        print(f"{name:<10} false repeats {stats['false_repeats']:5d} ({stats['false_repeat_rate']:.4f})  "
+              f"top counts {stats['top_plate_counts'][:3]}  {stats['us_per_sighting']:6.1f} us/sighting",
+              file=sys.stderr)
+        if stats['false_repeat_rate'] > args.repeat_error:
+            print(f"OVER TARGET {name}: false repeat rate {stats['false_repeat_rate']:.4f} > {args.repeat_error}",
+                  file=sys.stderr)
+            failed = True
+        if stats['max_overcount'] > stats['overcount_bound']:
+            print(f"OVER TARGET {name}: top_plates over-count {stats['max_overcount']} > "
+                  f"{stats['overcount_bound']:.1f}", file=sys.stderr)
+            failed = True
+
+    output = json.dumps({'meta': vars(args), 'results': results}, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
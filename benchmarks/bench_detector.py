@@ -0,0 +1,159 @@
+"""
+Reproducible benchmark of the detection pipeline on synthetic frames.
+
+Run from the repository root:
+    python -m benchmarks.bench_detector --output results.json
+    python -m benchmarks.bench_detector --baseline results.json --threshold 0.1
+
+Exits with status 1 when a benchmark is slower than the baseline by more
+than the threshold (compared on median latency).
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from plate_detector import NumberPlateDetector
+from benchmarks.synthetic import RESOLUTIONS, generate_frames
+
+
+def benchmark_targets(detector):
+    """Name -> callable(frame) for every benchmarked entry point"""
+    return {
+        'cascade': detector._detect_with_cascade,
+        'contours': detector._detect_with_contours,
+        'edges': detector._detect_with_edges,
+        'detect_plates': detector.detect_plates,
+    }
+
+
+def measure(func, frames, repeat, warmup=1):
+    """Latency samples (ms) of func over the frames, plus peak Python-tracked memory"""
+    for frame in frames[:warmup]:
+        func(frame)
+
+    samples = []
+    for _ in range(repeat):
+        for frame in frames:
+            started = time.perf_counter()
+            func(frame)
+            samples.append((time.perf_counter() - started) * 1000)
+
+    # Memory is measured in a separate pass so tracing does not skew the timings
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    for frame in frames:
+        func(frame)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    samples = np.array(samples)
+    return {
+        'calls': len(samples),
+        'mean_ms': round(float(samples.mean()), 3),
+        'p50_ms': round(float(np.percentile(samples, 50)), 3),
+        'p95_ms': round(float(np.percentile(samples, 95)), 3),
+        'min_ms': round(float(samples.min()), 3),
+        'fps': round(1000.0 / float(samples.mean()), 2),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def run(resolutions, targets, frames_per_resolution, repeat, seed, detection_scale=1.0):
+    results = {}
+    for resolution in resolutions:
+        frames = generate_frames(resolution, frames_per_resolution, seed)
+        results[resolution] = {}
+        for name in targets:
+            # Fresh, seeded detector per benchmark so simulated randomness is identical between runs
+            random.seed(seed)
+            detector = NumberPlateDetector(seed=seed)
+            detector.detection_scale = detection_scale
+            func = benchmark_targets(detector)[name]
+            results[resolution][name] = measure(func, frames, repeat)
+            print(f"{resolution:>6} {name:<14} p50 {results[resolution][name]['p50_ms']:9.2f} ms "
+                  f"p95 {results[resolution][name]['p95_ms']:9.2f} ms "
+                  f"peak {results[resolution][name]['peak_memory_kb']:9.1f} KB", file=sys.stderr)
+    return results
+
+
+def compare(current, baseline, threshold, metric='p50_ms'):
+    """Return (resolution, target, baseline, current, change) for every regression"""
+    regressions = []
+    for resolution, targets in current['results'].items():
+        for name, stats in targets.items():
+            previous = baseline.get('results', {}).get(resolution, {}).get(name)
+            if not previous or not previous.get(metric):
+                continue
+            change = stats[metric] / previous[metric] - 1.0
+            if change > threshold:
+                regressions.append((resolution, name, previous[metric], stats[metric], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark NumberPlateDetector on synthetic frames")
+    parser.add_argument('--resolutions', nargs='+', choices=list(RESOLUTIONS),
+                        default=['480p', '720p', '1080p', '4k'])
+    parser.add_argument('--targets', nargs='+', choices=list(benchmark_targets(NumberPlateDetector())),
+                        default=['cascade', 'contours', 'edges', 'detect_plates'])
+    parser.add_argument('--frames', type=int, default=3, help="Distinct frames per resolution")
+    parser.add_argument('--repeat', type=int, default=3, help="Passes over the frames")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--detection-scale', type=float, default=1.0,
+                        help="NumberPlateDetector.detection_scale used for detect_plates")
+    parser.add_argument('--threads', type=int, help="cv2.setNumThreads value for the run")
+    parser.add_argument('-o', '--output', help="Write results as JSON to this file")
+    parser.add_argument('--baseline', help="Previous results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="Allowed relative slowdown before a regression is reported")
+    args = parser.parse_args(argv)
+
+    if args.threads is not None:
+        cv2.setNumThreads(args.threads)
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'cv2_threads': cv2.getNumThreads(),
+            'seed': args.seed,
+            'frames': args.frames,
+            'repeat': args.repeat,
+            'detection_scale': args.detection_scale,
+        },
+        'results': run(args.resolutions, args.targets, args.frames, args.repeat, args.seed,
+                       args.detection_scale)
+    }
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for resolution, name, previous, current, change in regressions:
+            print(f"REGRESSION {resolution} {name}: {previous:.2f} ms -> {current:.2f} ms ({change:+.1%})",
+                  file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"No regressions above {args.threshold:.0%}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
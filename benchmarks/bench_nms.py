@@ -0,0 +1,104 @@
+"""
+Micro-benchmark: vectorized NMS against the previous pure-Python duplicate removal.
+
+Run from the repository root:
+    python -m benchmarks.bench_nms
+"""
+import argparse
+import random
+import timeit
+
+import numpy as np
+
+from nms import non_max_suppression
+from plate_detector import NumberPlateDetector
+
+
+def legacy_remove_duplicates(results):
+    """The O(n^2) loop that NumberPlateDetector._remove_duplicates used to run"""
+    if not results:
+        return results
+
+    results.sort(key=lambda x: x['confidence'], reverse=True)
+
+    filtered_results = []
+    for result in results:
+        is_duplicate = False
+        x1, y1, x2, y2 = result['bbox']
+
+        for existing in filtered_results:
+            ex1, ey1, ex2, ey2 = existing['bbox']
+
+            overlap_x = max(0, min(x2, ex2) - max(x1, ex1))
+            overlap_y = max(0, min(y2, ey2) - max(y1, ey1))
+            overlap_area = overlap_x * overlap_y
+
+            area1 = (x2 - x1) * (y2 - y1)
+            area2 = (ex2 - ex1) * (ey2 - ey1)
+
+            if overlap_area > 0.5 * min(area1, area2):
+                is_duplicate = True
+                break
+
+        if not is_duplicate:
+            filtered_results.append(result)
+
+    return filtered_results
+
+
+def make_candidates(count, seed=0, width=1920, height=1080):
+    """Plate-shaped candidate boxes scattered over a frame, with clusters of overlaps"""
+    rng = random.Random(seed)
+    methods = ['cascade', 'contour', 'edge']
+    candidates = []
+    for _ in range(count):
+        w = rng.randint(80, 300)
+        h = max(21, int(w / rng.uniform(2.1, 4.9)))
+        x = rng.randint(0, width - w)
+        y = rng.randint(0, height - h)
+        candidates.append({
+            'bbox': [x, y, x + w, y + h],
+            'confidence': rng.uniform(0.6, 0.95),
+            'method': rng.choice(methods)
+        })
+    return candidates
+
+
+def run(sizes, repeat):
+    detector = NumberPlateDetector()
+    rows = []
+    for count in sizes:
+        candidates = make_candidates(count)
+        boxes = np.array([c['bbox'] for c in candidates], dtype=np.float64)
+        scores = np.array([c['confidence'] for c in candidates], dtype=np.float64)
+
+        # Sanity check: both implementations keep the same boxes
+        legacy = legacy_remove_duplicates([dict(c) for c in candidates])
+        current = detector._remove_duplicates([dict(c) for c in candidates])
+        assert [r['bbox'] for r in legacy] == [r['bbox'] for r in current]
+
+        number = max(1, 2000 // count)
+        legacy_time = min(timeit.repeat(lambda: legacy_remove_duplicates(list(candidates)),
+                                        number=number, repeat=repeat)) / number
+        dedup_time = min(timeit.repeat(lambda: detector._remove_duplicates(list(candidates)),
+                                       number=number, repeat=repeat)) / number
+        nms_time = min(timeit.repeat(lambda: non_max_suppression(boxes, scores),
+                                     number=number, repeat=repeat)) / number
+        rows.append((count, len(current), legacy_time, dedup_time, nms_time))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark duplicate removal")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'candidates':>10} {'kept':>6} {'legacy ms':>10} {'dedup ms':>10} {'nms ms':>10} {'speedup':>8}")
+    for count, kept, legacy_time, dedup_time, nms_time in run(args.sizes, args.repeat):
+        print(f"{count:>10} {kept:>6} {legacy_time * 1000:>10.3f} {dedup_time * 1000:>10.3f} "
+              f"{nms_time * 1000:>10.3f} {legacy_time / dedup_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Cold start benchmark: every scenario runs in a fresh interpreter, as a
+short-lived batch worker would.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --repeat 10 -o startup.json --target-ms 350
+
+Reports the wall time of the whole process (interpreter start included), the
+time spent in the scenario itself and the peak RSS. Exits with status 1 when
+the median wall time of the 'detector' scenario (ready to detect: imports,
+construction and the cascade loaded) exceeds --target-ms.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import generate_frame
+
+# Median wall time, in ms, for a worker to be ready to detect
+DEFAULT_TARGET_MS = 350
+
+SCENARIOS = {
+    'interpreter': "pass",
+    'plate_core': "import plate_core",
+    'state_mapper': "from plate_core import StateMapper\n"
+                    "StateMapper().get_location_info('KA01AB1234')",
+    'detector': "from plate_core import NumberPlateDetector\n"
+                "NumberPlateDetector().plate_cascade",
+    'first_detection': "import cv2\n"
+                       "from plate_core import NumberPlateDetector\n"
+                       "NumberPlateDetector().detect_plates(cv2.imread(FRAME_PATH))",
+    'service': "import service",
+    'gui': "import main",
+}
+
+# Runs in the child: times the scenario and reports what it loaded
+_CHILD = """
+import json, resource, sys, time
+
+def peak_rss_kb():
+    # ru_maxrss survives exec on Linux and would report the parent's peak
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+started = time.perf_counter()
+FRAME_PATH = sys.argv[1]
+exec(compile(sys.argv[2], '<scenario>', 'exec'))
+elapsed = time.perf_counter() - started
+print(json.dumps({
+    'scenario_ms': elapsed * 1000,
+    'max_rss_mb': peak_rss_kb() / 1024,
+    'modules': len(sys.modules),
+    'loaded': sorted(m for m in ('cv2', 'numpy', 'PIL', 'tkinter', 'sqlite3', 'multiprocessing')
+                     if m in sys.modules)
+}))
+"""
+
+
+def run_once(code, frame_path):
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-c', _CHILD, frame_path, code],
+                               capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - started) * 1000
+    if completed.returncode != 0:
+        return None, completed.stderr.strip().splitlines()[-1:]
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result['wall_ms'] = wall_ms
+    return result, None
+
+
+def measure(code, frame_path, repeat):
+    runs = []
+    for _ in range(repeat):
+        result, error = run_once(code, frame_path)
+        if result is None:
+            return {'error': error[0] if error else 'failed'}
+        runs.append(result)
+    wall = np.array([run['wall_ms'] for run in runs])
+    scenario = np.array([run['scenario_ms'] for run in runs])
+    return {
+        'runs': repeat,
+        'wall_p50_ms': round(float(np.percentile(wall, 50)), 1),
+        'wall_min_ms': round(float(wall.min()), 1),
+        'scenario_p50_ms': round(float(np.percentile(scenario, 50)), 1),
+        'max_rss_mb': round(max(run['max_rss_mb'] for run in runs), 1),
+        'modules': runs[-1]['modules'],
+        'loaded': runs[-1]['loaded'],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold start time and memory of the core modules")
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--repeat', type=int, default=5, help="Fresh processes per scenario")
+    parser.add_argument('--target-ms', type=float, default=DEFAULT_TARGET_MS,
+                        help="Allowed median wall time of the 'detector' scenario")
+    parser.add_argument('-o', '--output', help="Write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    # Scenarios import the repository's modules from the working directory
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(root)
+    with tempfile.TemporaryDirectory() as tmp:
+        frame_path = os.path.join(tmp, 'frame.png')
+        cv2.imwrite(frame_path, generate_frame(1280, 720))
+
+        results = {}
+        for name in args.scenarios:
+            results[name] = stats = measure(SCENARIOS[name], frame_path, args.repeat)
+            if 'error' in stats:
+                print(f"{name:<16} skipped: {stats['error']}", file=sys.stderr)
+                continue
+            print(f"{name:<16} wall {stats['wall_p50_ms']:8.1f} ms  scenario {stats['scenario_p50_ms']:8.1f} ms  "
+                  f"rss {stats['max_rss_mb']:6.1f} MB  {' '.join(stats['loaded'])}", file=sys.stderr)
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'machine': platform.machine(),
+            'repeat': args.repeat,
+            'target_ms': args.target_ms,
+        },
+        'results': results
+    }
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    detector = results.get('detector', {})
+    if 'wall_p50_ms' in detector and detector['wall_p50_ms'] > args.target_ms:
+        print(f"OVER TARGET detector cold start: {detector['wall_p50_ms']:.1f} ms > {args.target_ms:.0f} ms",
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""Deterministic synthetic frames with plate-like regions for benchmarking"""
+import cv2
+import numpy as np
+
+RESOLUTIONS = {
+    '480p': (854, 480),
+    '720p': (1280, 720),
+    '1080p': (1920, 1080),
+    '4k': (3840, 2160),
+}
+
+PLATE_TEXTS = ["MH09AB1234", "DL01BC5678", "KA05MN9012", "TN07PQ3456",
+               "GJ02RS7890", "RJ14UV2345", "UP16XY6789", "WB19CD0123"]
+
+
+def generate_frame(width, height, seed=0, plates=4, distractors=12):
+    """
+    Render a BGR frame: a noisy gradient background, random distractor shapes
+    and plate-like white rectangles with dark borders and text.
+    The same arguments always produce the same frame.
+    """
+    rng = np.random.default_rng(seed)
+
+    # Vertical gradient (sky to road) plus sensor noise
+    gradient = np.linspace(150, 70, height, dtype=np.float32)[:, None, None]
+    noise = rng.normal(0, 12, (height, width, 3)).astype(np.float32)
+    frame = np.clip(gradient + noise, 0, 255).astype(np.uint8)
+
+    # Plate size scales with the resolution, relative to 720p
+    scale = height / 720.0
+
+    for _ in range(distractors):
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        if rng.random() < 0.5:
+            w, h = int(rng.integers(20, 200) * scale), int(rng.integers(20, 200) * scale)
+            cv2.rectangle(frame, (x, y), (x + w, y + h), color, -1)
+        else:
+            cv2.circle(frame, (x, y), int(rng.integers(10, 80) * scale), color, -1)
+
+    for _ in range(plates):
+        w = int(rng.integers(160, 260) * scale)
+        h = int(w / rng.uniform(3.5, 4.5))
+        x = int(rng.integers(0, max(1, width - w)))
+        y = int(rng.integers(0, max(1, height - h)))
+        cv2.rectangle(frame, (x, y), (x + w, y + h), (235, 235, 235), -1)
+        cv2.rectangle(frame, (x, y), (x + w, y + h), (20, 20, 20), max(2, int(3 * scale)))
+
+        text = PLATE_TEXTS[int(rng.integers(0, len(PLATE_TEXTS)))]
+        font_scale = h / 45.0
+        thickness = max(1, int(2 * scale))
+        (text_w, text_h), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+        font_scale *= min(1.0, (w * 0.9) / max(text_w, 1))
+        (text_w, text_h), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+        origin = (x + (w - text_w) // 2, y + (h + text_h) // 2)
+        cv2.putText(frame, text, origin, cv2.FONT_HERSHEY_SIMPLEX, font_scale, (20, 20, 20), thickness)
+
+    return frame
+
+
+def generate_frames(resolution, count=4, seed=0):
+    """A list of distinct but reproducible frames for a named resolution"""
+    width, height = RESOLUTIONS[resolution]
+    return [generate_frame(width, height, seed=seed + i) for i in range(count)]
@@ -0,0 +1,286 @@
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from watchlist import normalize_plate
+
+SIGHTING_FIELDS = ('timestamp', 'stream', 'frame', 'track_id', 'plate', 'state', 'district',
+                   'confidence', 'method', 'x1', 'y1', 'x2', 'y2')
+
+
+class DetectionStore:
+    """
+    Where detections are kept. Subclasses implement _write, query and purge.
+
+    add() turns detect_plates() results into flat sighting rows (see
+    SIGHTING_FIELDS); plates without text are not stored. When a StateMapper
+    is given, state and district are filled in for detections that lack them.
+    """
+
+    def __init__(self, state_mapper=None, retention_s=None):
+        self.state_mapper = state_mapper
+        # Sightings older than this many seconds are removed by purge() (None keeps everything)
+        self.retention_s = retention_s
+
+    def add(self, detections, stream=None, frame=None, timestamp=None):
+        """Store one frame's detections, returns the number of sightings stored"""
+        timestamp = time.time() if timestamp is None else timestamp
+        rows = []
+        for detection in detections:
+            plate = normalize_plate(detection.get('text') or '')
+            if not plate:
+                continue
+            state, district = detection.get('state'), detection.get('district')
+            if state is None and self.state_mapper is not None:
+                info = self.state_mapper.get_location_info(plate)
+                state, district = info['state'], info['district']
+            x1, y1, x2, y2 = (int(v) for v in detection['bbox'])
+            rows.append((timestamp, stream, frame, detection.get('track_id'), plate, state, district,
+                         round(float(detection['confidence']), 4), detection.get('method'),
+                         x1, y1, x2, y2))
+        if rows:
+            self._write(rows)
+        return len(rows)
+
+    def query(self, plate=None, start=None, end=None, state=None, stream=None, track_id=None,
+              limit=1000):
+        """Sightings matching every given filter, newest first, as dicts"""
+        raise NotImplementedError
+
+    def purge(self, before=None):
+        """Remove sightings older than before (default: now - retention_s), returns the count"""
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+    def flush(self):
+        """Wait until every added sighting is stored"""
+
+    def close(self):
+        self.flush()
+
+    def _cutoff(self, before):
+        if before is None:
+            if self.retention_s is None:
+                return None
+            before = time.time() - self.retention_s
+        return before
+
+    def _write(self, rows):
+        raise NotImplementedError
+
+
+class MemoryDetectionStore(DetectionStore):
+    """Keeps the most recent max_rows sightings in memory"""
+
+    def __init__(self, max_rows=10000, state_mapper=None, retention_s=None):
+        super().__init__(state_mapper, retention_s)
+        self._rows = deque(maxlen=max_rows)
+        self._lock = threading.Lock()
+
+    def _write(self, rows):
+        with self._lock:
+            self._rows.extend(dict(zip(SIGHTING_FIELDS, row)) for row in rows)
+
+    def query(self, plate=None, start=None, end=None, state=None, stream=None, track_id=None,
+              limit=1000):
+        plate = normalize_plate(plate) if plate else None
+        results = []
+        with self._lock:
+            for row in reversed(self._rows):
+                if ((plate is None or row['plate'] == plate) and
+                        (start is None or row['timestamp'] >= start) and
+                        (end is None or row['timestamp'] < end) and
+                        (state is None or row['state'] == state) and
+                        (stream is None or row['stream'] == stream) and
+                        (track_id is None or row['track_id'] == track_id)):
+                    results.append(dict(row))
+                    if len(results) >= limit:
+                        break
+        return results
+
+    def purge(self, before=None):
+        before = self._cutoff(before)
+        if before is None:
+            return 0
+        with self._lock:
+            kept = [row for row in self._rows if row['timestamp'] >= before]
+            removed = len(self._rows) - len(kept)
+            self._rows.clear()
+            self._rows.extend(kept)
+        return removed
+
+    def count(self):
+        return len(self._rows)
+
+
+class SqliteDetectionStore(DetectionStore):
+    """
+    Sightings in an SQLite database in WAL mode, so searches do not block writes.
+
+    add() only queues the rows. A writer thread inserts them in batches of up
+    to batch_size, or every flush_interval seconds, one transaction per batch.
+    Plate, timestamp, stream/track and state are indexed. When retention_s is
+    set, the writer purges old sightings every purge_interval seconds and the
+    freed pages are returned to the file by compact().
+    """
+
+    def __init__(self, path='detections.db', batch_size=500, flush_interval=0.5, state_mapper=None,
+                 retention_s=None, purge_interval=300.0):
+        super().__init__(state_mapper, retention_s)
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.purge_interval = purge_interval
+        self._pending = queue.Queue()
+        self._closed = False
+        # Sightings lost to database errors
+        self.failed_rows = 0
+
+        self._reader = self._connect()
+        self._create_schema(self._reader)
+        self._read_lock = threading.Lock()
+
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        # Only takes effect on a new database, before the first table and the switch to WAL
+        connection.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        connection.execute('PRAGMA journal_mode=WAL')
+        # With WAL, NORMAL only risks the last transactions on power loss, never corruption
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def _create_schema(self, connection):
+        with connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS sightings (
+                    id INTEGER PRIMARY KEY,
+                    timestamp REAL NOT NULL,
+                    stream TEXT,
+                    frame INTEGER,
+                    track_id INTEGER,
+                    plate TEXT NOT NULL,
+                    state TEXT,
+                    district TEXT,
+                    confidence REAL,
+                    method TEXT,
+                    x1 INTEGER, y1 INTEGER, x2 INTEGER, y2 INTEGER
+                )""")
+            connection.execute('CREATE INDEX IF NOT EXISTS sightings_plate ON sightings (plate, timestamp)')
+            connection.execute('CREATE INDEX IF NOT EXISTS sightings_timestamp ON sightings (timestamp)')
+            connection.execute('CREATE INDEX IF NOT EXISTS sightings_track ON sightings (stream, track_id)')
+            connection.execute('CREATE INDEX IF NOT EXISTS sightings_state ON sightings (state, timestamp)')
+
+    def _write(self, rows):
+        if self._closed:
+            raise ValueError("Detection store is closed")
+        self._pending.put(rows)
+
+    def _write_loop(self):
+        connection = self._connect()
+        insert = f"INSERT INTO sightings ({', '.join(SIGHTING_FIELDS)}) VALUES ({', '.join('?' * len(SIGHTING_FIELDS))})"
+        last_purge = time.monotonic()
+        running = True
+        while running:
+            # Collect everything queued so far into one batch
+            batches = []
+            try:
+                batches.append(self._pending.get(timeout=self.flush_interval))
+                while batches[-1] is not None and sum(len(rows) for rows in batches) < self.batch_size:
+                    batches.append(self._pending.get_nowait())
+            except queue.Empty:
+                pass
+            running = not batches or batches[-1] is not None
+
+            batch = [row for rows in batches if rows is not None for row in rows]
+            try:
+                if batch:
+                    with connection:
+                        connection.executemany(insert, batch)
+            except sqlite3.Error as e:
+                # e.g. a locked or full database: drop this batch, keep the writer alive
+                self.failed_rows += len(batch)
+                print(f"Error storing {len(batch)} sightings: {e}")
+            finally:
+                # Mark the batches (and the close marker) done once they are committed or dropped
+                for _ in batches:
+                    self._pending.task_done()
+
+            if self.retention_s is not None and time.monotonic() - last_purge >= self.purge_interval:
+                last_purge = time.monotonic()
+                try:
+                    self._purge(connection, self._cutoff(None))
+                except sqlite3.Error as e:
+                    print(f"Error purging old sightings: {e}")
+        connection.close()
+
+    def flush(self):
+        self._pending.join()
+
+    def close(self):
+        """Store everything still queued and stop the writer"""
+        if self._closed:
+            return
+        self._closed = True
+        self._pending.put(None)
+        self._writer.join()
+        with self._read_lock:
+            self._reader.close()
+
+    def query(self, plate=None, start=None, end=None, state=None, stream=None, track_id=None,
+              limit=1000):
+        conditions, params = [], []
+        if plate:
+            conditions.append('plate = ?')
+            params.append(normalize_plate(plate))
+        if start is not None:
+            conditions.append('timestamp >= ?')
+            params.append(start)
+        if end is not None:
+            conditions.append('timestamp < ?')
+            params.append(end)
+        if state is not None:
+            conditions.append('state = ?')
+            params.append(state)
+        if stream is not None:
+            conditions.append('stream = ?')
+            params.append(stream)
+        if track_id is not None:
+            conditions.append('track_id = ?')
+            params.append(track_id)
+
+        sql = f"SELECT {', '.join(SIGHTING_FIELDS)} FROM sightings"
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY timestamp DESC LIMIT ?'
+        params.append(limit)
+        with self._read_lock:
+            rows = self._reader.execute(sql, params).fetchall()
+        return [dict(zip(SIGHTING_FIELDS, row)) for row in rows]
+
+    def count(self):
+        with self._read_lock:
+            return self._reader.execute('SELECT COUNT(*) FROM sightings').fetchone()[0]
+
+    def purge(self, before=None):
+        before = self._cutoff(before)
+        if before is None:
+            return 0
+        with self._read_lock:
+            return self._purge(self._reader, before)
+
+    def _purge(self, connection, before):
+        with connection:
+            return connection.execute('DELETE FROM sightings WHERE timestamp < ?', (before,)).rowcount
+
+    def compact(self):
+        """Return pages freed by purges to the file system and truncate the WAL"""
+        with self._read_lock:
+            self._reader.execute('PRAGMA incremental_vacuum')
+            self._reader.execute('PRAGMA wal_checkpoint(TRUNCATE)')
@@ -0,0 +1,89 @@
+import time
+import tkinter as tk
+from collections import deque
+
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+
+class FrameDisplay:
+    """
+    Shows BGR frames in a Tk label, scaled to a fixed width. Call from the Tk thread only.
+
+    The PhotoImage and the resize/RGB buffers are created once per frame size
+    and reused: each frame is resized straight into the buffer, converted to
+    RGBA in place and pasted into the existing PhotoImage.
+    """
+
+    def __init__(self, label, width=800):
+        self.label = label
+        self.width = width
+        self._source_shape = None
+        self._resized = None
+        self._rgb = None
+        self._image = None
+        self._photo = None
+
+    def _allocate(self, shape):
+        height, width = shape[:2]
+        display_height = max(1, int(height * (self.width / width)))
+        self._resized = np.empty((display_height, self.width, 3), dtype=np.uint8)
+        self._rgb = np.empty((display_height, self.width, 4), dtype=np.uint8)
+        # Shares memory with self._rgb, so it always holds the latest frame.
+        # PIL only maps 4 byte pixel buffers without copying, hence RGBA rather than RGB.
+        self._image = Image.frombuffer('RGBA', (self.width, display_height), self._rgb, 'raw', 'RGBA', 0, 1)
+        self._photo = ImageTk.PhotoImage(self._image)
+        self.label.config(image=self._photo, text='')
+        self._source_shape = shape
+
+    def show(self, frame):
+        if frame.shape != self._source_shape:
+            self._allocate(frame.shape)
+        height, width = self._resized.shape[:2]
+        cv2.resize(frame, (width, height), dst=self._resized, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._resized, cv2.COLOR_BGR2RGBA, dst=self._rgb)
+        self._photo.paste(self._image)
+
+    def clear(self, text=''):
+        self.label.config(image='', text=text)
+        self._source_shape = None
+        self._photo = None
+
+
+class ResultsLog:
+    """
+    Bounded view of the latest results in a Tk Text widget.
+
+    append() only records the entry; the widget is repainted from the ring
+    buffer at most max_fps times per second, from the Tk event loop.
+    """
+
+    def __init__(self, text_widget, max_entries=200, max_fps=4):
+        self.text = text_widget
+        self.entries = deque(maxlen=max_entries)
+        self.min_interval = 1.0 / max_fps
+        self._last_paint = 0.0
+        self._scheduled = None
+
+    def append(self, text, tag=None):
+        self.entries.append((text, (tag,) if tag else ()))
+        self._schedule()
+
+    def clear(self):
+        self.entries.clear()
+        self._schedule()
+
+    def _schedule(self):
+        if self._scheduled is not None:
+            return
+        delay = max(0.0, self._last_paint + self.min_interval - time.monotonic())
+        self._scheduled = self.text.after(int(delay * 1000), self._repaint)
+
+    def _repaint(self):
+        self._scheduled = None
+        self._last_paint = time.monotonic()
+        self.text.delete(1.0, tk.END)
+        for text, tags in self.entries:
+            self.text.insert(tk.END, text, *tags)
+        self.text.see(tk.END)
@@ -0,0 +1,125 @@
+import time
+
+import cv2
+
+
+class FrameReader:
+    """
+    Reads every stride-th frame of a cv2.VideoCapture within [start_frame, end_frame).
+    The reader seeks straight to start_frame, and frames in between samples are
+    only grabbed (demuxed), never retrieved (decoded and converted).
+    """
+
+    def __init__(self, cap, stride=1, start_frame=0, end_frame=None):
+        if stride < 1:
+            raise ValueError("stride must be at least 1")
+        self.cap = cap
+        self.stride = stride
+        self.start_frame = max(0, int(start_frame or 0))
+        self.end_frame = end_frame
+        source_fps = cap.get(cv2.CAP_PROP_FPS)
+        self.source_fps = source_fps if source_fps and source_fps > 0 else 30.0
+        # Index of the next frame the capture will return
+        self.index = 0
+        # Index of the frame returned by the last read()
+        self.frame_index = None
+        self._started = False
+
+    @classmethod
+    def from_time_range(cls, cap, stride=1, start_s=None, end_s=None):
+        """Reader for the frames between start_s and end_s seconds"""
+        source_fps = cap.get(cv2.CAP_PROP_FPS)
+        fps = source_fps if source_fps and source_fps > 0 else 30.0
+        start_frame = int(round(start_s * fps)) if start_s else 0
+        end_frame = int(round(end_s * fps)) if end_s is not None else None
+        return cls(cap, stride, start_frame, end_frame)
+
+    @property
+    def fps(self):
+        """Rate of the frames this reader returns, in source time"""
+        return self.source_fps / self.stride
+
+    @property
+    def timestamp_ms(self):
+        """Source timestamp of the last frame returned"""
+        if self.frame_index is None:
+            return None
+        return self.frame_index * 1000.0 / self.source_fps
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+    def _seek(self):
+        self._started = True
+        if self.start_frame > 0:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame)
+            position = self.cap.get(cv2.CAP_PROP_POS_FRAMES)
+            self.index = int(position) if position and position > 0 else self.start_frame
+            # Some backends seek to the previous keyframe, grab forward to the exact frame
+            while self.index < self.start_frame:
+                if not self.cap.grab():
+                    return False
+                self.index += 1
+        return True
+
+    def read(self, image=None):
+        """
+        Return (ret, frame) for the next sampled frame, like cv2.VideoCapture.read().
+        A preallocated image of the right shape is filled in place.
+        """
+        if not self._started:
+            if not self._seek():
+                return False, None
+        elif self.stride > 1:
+            for _ in range(self.stride - 1):
+                if self.end_frame is not None and self.index >= self.end_frame:
+                    return False, None
+                if not self.cap.grab():
+                    return False, None
+                self.index += 1
+
+        if self.end_frame is not None and self.index >= self.end_frame:
+            return False, None
+
+        ret, frame = self.cap.read(image)
+        if not ret:
+            return False, None
+        self.frame_index = self.index
+        self.index += 1
+        return True, frame
+
+    def __iter__(self):
+        """Yield (frame_index, frame) pairs until the range or the video ends"""
+        while True:
+            ret, frame = self.read()
+            if not ret:
+                return
+            yield self.frame_index, frame
+
+
+class FramePacer:
+    """
+    Paces a read loop at fps: wait() sleeps until the next frame is due. After a
+    stall longer than one frame (e.g. a slow decode) it resynchronises instead of
+    bursting through the missed frames. stop_event is a threading or
+    multiprocessing Event that interrupts the wait.
+    """
+
+    def __init__(self, fps, stop_event):
+        self.interval = 1.0 / fps
+        self.stop_event = stop_event
+        self.next_due = time.monotonic()
+
+    def wait(self):
+        """Wait for the next frame. Returns False if stop_event was set meanwhile."""
+        delay = self.next_due - time.monotonic()
+        if delay > 0:
+            if self.stop_event.wait(delay):
+                return False
+        elif delay < -self.interval:
+            self.next_due = time.monotonic()
+        self.next_due += self.interval
+        return True
@@ -1,13 +1,19 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import cv2
-import numpy as np
-from PIL import Image, ImageTk
-import threading
 import queue
 import time
-from plate_detector import NumberPlateDetector
+from collections import deque
+from plate_detector import create_detector
 from state_mapper import StateMapper
+from tracker import PlateTracker
+from motion import MotionGate
+from video_pipeline import VideoPipeline, ProcessVideoPipeline, QueueClosed
+from profiling import DetectorProfiler
+from watchlist import Watchlist
+from detection_store import SqliteDetectionStore
+from analytics import SightingAnalytics
+from display import FrameDisplay, ResultsLog
 
 class NumberPlateApp:
     def __init__(self, root):
@@ -17,26 +23,43 @@ class NumberPlateApp:
         self.root.configure(bg='#2c3e50')
         
         # Initialize components
-        self.detector = NumberPlateDetector()
+        self.detector = create_detector()
+        self.profiler = DetectorProfiler(window=300)
+        self.detector.profiler = self.profiler
         self.state_mapper = StateMapper()
+        self.tracker = PlateTracker()
+        self.watchlist = Watchlist()
         
         # Video processing variables
         self.video_path = None
         self.cap = None
         self.is_playing = False
         self.current_frame = None
-        self.detected_plates = []
+        # Sightings go to disk, only the session count is kept in memory
+        self.detection_store = SqliteDetectionStore('detections.db', state_mapper=self.state_mapper,
+                                                    retention_s=30 * 24 * 3600)
+        self.plates_detected = 0
+        self.analytics = SightingAnalytics(self.state_mapper)
+        self.motion_gate = None
         
         # Image processing variables
         self.image_path = None
         self.current_image = None
         self.is_image_mode = False
         
-        # Threading
-        self.frame_queue = queue.Queue()
-        self.result_queue = queue.Queue()
+        # Threading: decode -> detection -> render pipeline
+        self.pipeline = None
+        # Milliseconds between polls of the pipeline from the Tk event loop
+        self.poll_interval_ms = 15
+        self.poll_job = None
+        # Detections of every processed frame, kept apart from the latest-wins frame handoff
+        # so none are lost when frames are dropped; drained on the Tk thread
+        self.detection_log = deque()
         
         self.setup_ui()
+        self.frame_display = FrameDisplay(self.video_label, width=800)
+        # Keep the last 200 results, repainted at most 4 times per second
+        self.results_log = ResultsLog(self.results_text, max_entries=200, max_fps=4)
         
     def setup_ui(self):
         # Main container
@@ -80,6 +103,49 @@ class NumberPlateApp:
                                  font=('Arial', 12, 'bold'), padx=20, state=tk.DISABLED)
         self.stop_btn.pack(side=tk.LEFT, padx=5)
         
+        self.watchlist_btn = tk.Button(controls_frame, text="Load Watchlist", 
+                                      command=self.load_watchlist, bg='#16a085', fg='white',
+                                      font=('Arial', 12, 'bold'), padx=20)
+        self.watchlist_btn.pack(side=tk.LEFT, padx=5)
+        
+        # Only search moving regions (for fixed cameras)
+        self.motion_gating_var = tk.BooleanVar(value=False)
+        self.motion_gating_check = tk.Checkbutton(controls_frame, text="Motion Gating",
+                                                  variable=self.motion_gating_var,
+                                                  fg='white', bg='#34495e', selectcolor='#2c3e50',
+                                                  activebackground='#34495e', activeforeground='white',
+                                                  font=('Arial', 11))
+        self.motion_gating_check.pack(side=tk.LEFT, padx=5)
+        
+        # Sampling options: every Nth frame within an optional time range
+        sampling_frame = tk.Frame(left_frame, bg='#34495e')
+        sampling_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+        
+        tk.Label(sampling_frame, text="Frame Stride:", fg='white', bg='#34495e',
+                 font=('Arial', 11)).pack(side=tk.LEFT, padx=(5, 2))
+        self.stride_var = tk.IntVar(value=1)
+        tk.Spinbox(sampling_frame, from_=1, to=60, width=4, textvariable=self.stride_var,
+                   font=('Arial', 11)).pack(side=tk.LEFT, padx=(0, 10))
+        
+        tk.Label(sampling_frame, text="Start (s):", fg='white', bg='#34495e',
+                 font=('Arial', 11)).pack(side=tk.LEFT, padx=(5, 2))
+        self.start_time_var = tk.StringVar()
+        tk.Entry(sampling_frame, width=7, textvariable=self.start_time_var,
+                 font=('Arial', 11)).pack(side=tk.LEFT, padx=(0, 10))
+        
+        tk.Label(sampling_frame, text="End (s):", fg='white', bg='#34495e',
+                 font=('Arial', 11)).pack(side=tk.LEFT, padx=(5, 2))
+        self.end_time_var = tk.StringVar()
+        tk.Entry(sampling_frame, width=7, textvariable=self.end_time_var,
+                 font=('Arial', 11)).pack(side=tk.LEFT, padx=(0, 10))
+        
+        # More than one process moves detection out of this process (frames go through shared memory)
+        tk.Label(sampling_frame, text="Processes:", fg='white', bg='#34495e',
+                 font=('Arial', 11)).pack(side=tk.LEFT, padx=(5, 2))
+        self.processes_var = tk.IntVar(value=1)
+        tk.Spinbox(sampling_frame, from_=1, to=16, width=4, textvariable=self.processes_var,
+                   font=('Arial', 11)).pack(side=tk.LEFT, padx=(0, 10))
+        
         # Video display
         self.video_frame = tk.Frame(left_frame, bg='black', height=400)
         self.video_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
@@ -111,6 +177,22 @@ class NumberPlateApp:
                                       fg='white', bg='#34495e', font=('Arial', 11))
         self.accuracy_label.pack(anchor=tk.W, padx=5, pady=2)
         
+        self.analytics_label = tk.Label(stats_frame, text="Unique (1 min / 1 h): 0 / 0", justify=tk.LEFT,
+                                       fg='white', bg='#34495e', font=('Arial', 11))
+        self.analytics_label.pack(anchor=tk.W, padx=5, pady=2)
+        
+        self.pipeline_label = tk.Label(stats_frame, text="Queue: 0 | Dropped: 0", 
+                                      fg='white', bg='#34495e', font=('Arial', 11))
+        self.pipeline_label.pack(anchor=tk.W, padx=5, pady=2)
+        
+        self.fps_label = tk.Label(stats_frame, text="FPS: 0.0", 
+                                 fg='white', bg='#34495e', font=('Arial', 11))
+        self.fps_label.pack(anchor=tk.W, padx=5, pady=2)
+        
+        self.latency_label = tk.Label(stats_frame, text="Latency (p50/p95 ms): -", justify=tk.LEFT,
+                                     fg='white', bg='#34495e', font=('Courier', 9))
+        self.latency_label.pack(anchor=tk.W, padx=5, pady=2)
+        
         # Detection results frame
         results_frame = tk.LabelFrame(right_frame, text="Latest Detections", fg='white', bg='#34495e',
                                      font=('Arial', 12, 'bold'))
@@ -126,6 +208,7 @@ class NumberPlateApp:
         self.results_text.configure(yscrollcommand=scrollbar.set)
         
         self.results_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.results_text.tag_configure('watchlist', foreground='#e74c3c', font=('Courier', 10, 'bold'))
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
         # Status bar
@@ -145,6 +228,21 @@ class NumberPlateApp:
             self.play_btn.config(state=tk.NORMAL)
             self.reset_detection_data()
             
+    def load_watchlist(self):
+        file_path = filedialog.askopenfilename(
+            title="Select Watchlist",
+            filetypes=[("Text files", "*.txt *.csv"), ("All files", "*.*")]
+        )
+        
+        if file_path:
+            try:
+                self.watchlist.clear()
+                added = self.watchlist.load(file_path)
+            except (OSError, UnicodeDecodeError) as e:
+                messagebox.showerror("Error", f"Cannot load watchlist: {e}")
+                return
+            self.status_label.config(text=f"Watchlist loaded: {added} plates")
+            
     def upload_image(self):
         file_path = filedialog.askopenfilename(
             title="Select Image File",
@@ -166,18 +264,7 @@ class NumberPlateApp:
             self.update_detection_info(results)
 
     def update_image_display(self, frame):
-        height, width = frame.shape[:2]
-        display_width = 800
-        display_height = int(height * (display_width / width))
-
-        resized_frame = cv2.resize(frame, (display_width, display_height))
-
-        rgb_frame = cv2.cvtColor(resized_frame, cv2.COLOR_BGR2RGB)
-        pil_image = Image.fromarray(rgb_frame)
-        photo = ImageTk.PhotoImage(pil_image)
-
-        self.video_label.config(image=photo, text='')
-        self.video_label.image = photo
+        self.frame_display.show(frame)
 
     def toggle_playback(self):
         if not self.is_playing:
@@ -187,52 +274,105 @@ class NumberPlateApp:
             
     def start_video(self):
         if self.video_path:
-            self.cap = cv2.VideoCapture(self.video_path)
+            self.tracker.reset()
+            self.motion_gate = MotionGate() if self.motion_gating_var.get() else None
+            
+            stride, start_s, end_s = self.get_sampling_options()
+            processes = self.get_process_count()
+            self.release_capture()
+            if processes > 1:
+                # Decoder and detector processes exchange frames through a shared memory ring,
+                # boxes are drawn here on the shared frame
+                try:
+                    self.pipeline = ProcessVideoPipeline(self.video_path, self.draw_detections,
+                                                         workers=processes, stride=stride,
+                                                         start_s=start_s, end_s=end_s,
+                                                         factory_args=(self.detector.detection_scale,),
+                                                         on_detections=self.queue_detections)
+                except ValueError as e:
+                    messagebox.showerror("Error", str(e))
+                    return
+            else:
+                # Start decode and detection threads, the pipeline skips frames without decoding them
+                self.cap = cv2.VideoCapture(self.video_path)
+                self.pipeline = VideoPipeline(self.cap, self.process_frame,
+                                              stride=stride, start_s=start_s, end_s=end_s)
+            
             self.is_playing = True
             self.play_btn.config(text="Pause", bg='#f39c12')
             self.stop_btn.config(state=tk.NORMAL)
+            self.pipeline.start()
             
-            # Start video processing thread
-            self.video_thread = threading.Thread(target=self.process_video, daemon=True)
-            self.video_thread.start()
-            
-            # Start UI update thread
-            self.update_thread = threading.Thread(target=self.update_ui, daemon=True)
-            self.update_thread.start()
+            # Results are picked up from the Tk event loop, widgets are never touched from other threads
+            self.schedule_poll()
             
+    def get_sampling_options(self):
+        """Frame stride and time range from the sampling controls (invalid values are ignored)"""
+        def seconds(value):
+            try:
+                return max(0.0, float(value)) if value.strip() else None
+            except ValueError:
+                return None
+        
+        try:
+            stride = max(1, int(self.stride_var.get()))
+        except (tk.TclError, ValueError):
+            stride = 1
+        return stride, seconds(self.start_time_var.get()), seconds(self.end_time_var.get())
+        
+    def get_process_count(self):
+        try:
+            return max(1, int(self.processes_var.get()))
+        except (tk.TclError, ValueError):
+            return 1
+        
     def pause_video(self):
         self.is_playing = False
+        self.cancel_poll()
+        if self.pipeline:
+            self.pipeline.stop()
+        self.log_detections()
+        # Playback restarts with a new capture, do not keep the file or camera open meanwhile
+        self.release_capture()
         self.play_btn.config(text="Play", bg='#27ae60')
         
     def stop_video(self):
         self.is_playing = False
-        if self.cap:
-            self.cap.release()
+        self.cancel_poll()
+        if self.pipeline:
+            self.pipeline.stop()
+        self.log_detections()
+        self.release_capture()
         self.play_btn.config(text="Play", bg='#27ae60', state=tk.DISABLED)
         self.stop_btn.config(state=tk.DISABLED)
-        self.video_label.config(image='', text="No Video Loaded")
+        self.frame_display.clear("No Video Loaded")
         self.status_label.config(text="Video stopped")
         
-    def process_video(self):
-        while self.is_playing and self.cap and self.cap.isOpened():
-            ret, frame = self.cap.read()
-            if not ret:
-                break
-                
-            # Detect number plates
-            results = self.detector.detect_plates(frame)
-            
-            # Draw bounding boxes and extract text
-            processed_frame = self.draw_detections(frame, results)
-            
-            # Put frame in queue for UI update
-            try:
-                self.frame_queue.put_nowait((processed_frame, results))
-            except queue.Full:
-                pass
-                
-            time.sleep(0.033)  # ~30 FPS
-            
+    def release_capture(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+        
+    def process_frame(self, frame):
+        """Runs on the pipeline's detection worker"""
+        # Detect number plates, OCR runs once per tracked plate
+        results = self.detector.detect_plates(frame, tracker=self.tracker,
+                                              motion_gate=self.motion_gate)
+        
+        self.detection_log.append(results)
+        
+        # Draw bounding boxes and extract text
+        return self.draw_detections(frame, results)
+    
+    def queue_detections(self, frame_index, detections):
+        """Process pipeline hook, called for every processed frame even when it is not shown"""
+        self.detection_log.append(detections)
+    
+    def log_detections(self):
+        """Runs on the Tk thread: log every queued result"""
+        while self.detection_log:
+            self.update_detection_info(self.detection_log.popleft())
+        
     def draw_detections(self, frame, detections):
         processed_frame = frame.copy()
         
@@ -246,51 +386,80 @@ class NumberPlateApp:
             
             # Draw confidence and text
             label = f"{plate_text} ({confidence:.2f})"
+            if 'track_id' in detection:
+                label = f"#{detection['track_id']} {label}"
             cv2.putText(processed_frame, label, (x1, y1-10), 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
                        
         return processed_frame
         
-    def update_ui(self):
-        while self.is_playing:
+    def schedule_poll(self):
+        self.poll_job = self.root.after(self.poll_interval_ms, self.poll_pipeline)
+        
+    def cancel_poll(self):
+        if self.poll_job is not None:
+            self.root.after_cancel(self.poll_job)
+            self.poll_job = None
+        
+    def poll_pipeline(self):
+        """Runs on the Tk thread: show the newest processed frame and log every result"""
+        self.poll_job = None
+        pipeline = self.pipeline
+        if not self.is_playing or pipeline is None:
+            return
+        
+        frame = None
+        while True:
             try:
-                frame, detections = self.frame_queue.get_nowait()
-                
-                # Update video display
-                self.update_video_display(frame)
-                
-                # Update detection information
-                self.update_detection_info(detections)
-                
+                # Never blocks the event loop, older frames are already dropped by the pipeline
+                _, frame = pipeline.get_result(timeout=0)
             except queue.Empty:
-                pass
-                
-            time.sleep(0.033)
+                break
+            except QueueClosed:
+                self.is_playing = False
+                break
+        self.log_detections()
+        
+        # Only the newest frame is drawn, so a slow repaint never queues up frames
+        if frame is not None:
+            self.update_video_display(frame)
+            stats = pipeline.stats()
+            self.pipeline_label.config(
+                text=f"Queue: {stats['frame_queue_depth']} | Dropped: {stats['dropped_frames']}")
+            self.update_performance_stats(stats)
+        
+        if self.is_playing:
+            self.schedule_poll()
+        else:
+            self.play_btn.config(text="Play", bg='#27ae60')
             
-    def update_video_display(self, frame):
-        # Resize frame to fit display
-        height, width = frame.shape[:2]
-        display_width = 800
-        display_height = int(height * (display_width / width))
-        
-        resized_frame = cv2.resize(frame, (display_width, display_height))
-        
-        # Convert to RGB for PIL
-        rgb_frame = cv2.cvtColor(resized_frame, cv2.COLOR_BGR2RGB)
-        pil_image = Image.fromarray(rgb_frame)
-        photo = ImageTk.PhotoImage(pil_image)
+    def update_performance_stats(self, pipeline_stats=None):
+        snapshot = self.profiler.snapshot()
+        fps = snapshot['fps']
+        if isinstance(self.pipeline, ProcessVideoPipeline) and pipeline_stats:
+            # Detection runs in other processes, the local profiler sees no frames
+            fps = pipeline_stats['processing_fps']
+        self.fps_label.config(text=f"FPS: {fps:.1f}")
+        
+        lines = ["Latency (p50/p95 ms):"]
+        for stage in ('cascade', 'contours', 'edges', 'dedup', 'ocr', 'frame'):
+            summary = snapshot['timings_ms'].get(stage)
+            if summary and 'p50' in summary:
+                lines.append(f"  {stage:<9}{summary['p50']:7.1f} /{summary['p95']:7.1f}")
+        self.latency_label.config(text="\n".join(lines))
         
-        # Update label
-        self.video_label.config(image=photo, text='')
-        self.video_label.image = photo
+    def update_video_display(self, frame):
+        # Resized into the display's buffers and pasted into its PhotoImage, nothing is reallocated
+        self.frame_display.show(frame)
         
     def update_detection_info(self, detections):
         if detections:
-            self.detected_plates.extend(detections)
+            self.detection_store.add(detections)
+            self.analytics.add_detections(detections)
             
             # Update statistics
-            total_plates = len(self.detected_plates)
-            self.plates_detected_label.config(text=f"Plates Detected: {total_plates}")
+            self.plates_detected += len(detections)
+            self.plates_detected_label.config(text=f"Plates Detected: {self.plates_detected}")
             
             # Add new detections to results
             for detection in detections:
@@ -308,22 +477,58 @@ class NumberPlateApp:
                     result_text += f"District: {state_info['district']}\n"
                     result_text += f"Time: {time.strftime('%H:%M:%S')}\n"
                     
-                    self.results_text.insert(tk.END, result_text)
-                    self.results_text.see(tk.END)
+                    self.results_log.append(result_text)
+                    
+                    # Flag watchlist hits, tolerant to OCR confusions such as 0/O and 8/B
+                    hit = self.watchlist.match(plate_text) if len(self.watchlist) else None
+                    if hit:
+                        listed, distance = hit
+                        note = self.watchlist.entries[listed]
+                        hit_text = f"!! WATCHLIST HIT: {listed} (distance {distance})"
+                        if note:
+                            hit_text += f" - {note}"
+                        self.results_log.append(hit_text + "\n", 'watchlist')
+                        self.status_label.config(text=f"Watchlist hit: {listed}")
                     
             # Update accuracy (simplified calculation)
             valid_detections = sum(1 for d in detections if d.get('text'))
             if detections:
                 accuracy = (valid_detections / len(detections)) * 100
                 self.accuracy_label.config(text=f"Accuracy: {accuracy:.1f}%")
+            
+            self.update_analytics_stats()
+                
+    def update_analytics_stats(self):
+        analytics = self.analytics
+        lines = [f"Unique (1 min / 1 h): {analytics.unique_plates('minute')} / {analytics.unique_plates('hour')}",
+                 f"Repeat visitors (1 h): {analytics.repeat_visitors('hour')}"]
+        states = list(analytics.state_counts('hour').items())[:3]
+        if states:
+            lines.append("Top states: " + ", ".join(f"{state} ({count})" for state, count in states))
+        self.analytics_label.config(text="\n".join(lines))
                 
     def reset_detection_data(self):
-        self.detected_plates = []
+        self.plates_detected = 0
+        self.analytics = SightingAnalytics(self.state_mapper)
+        self.profiler.reset()
         self.plates_detected_label.config(text="Plates Detected: 0")
         self.accuracy_label.config(text="Accuracy: 0%")
-        self.results_text.delete(1.0, tk.END)
+        self.analytics_label.config(text="Unique (1 min / 1 h): 0 / 0")
+        self.results_log.clear()
+        
+    def on_close(self):
+        self.is_playing = False
+        self.cancel_poll()
+        if self.pipeline:
+            self.pipeline.stop()
+        self.release_capture()
+        # Write out queued sightings before exiting
+        self.detection_store.close()
+        self.detector.close()
+        self.root.destroy()
 
 if __name__ == "__main__":
     root = tk.Tk()
     app = NumberPlateApp(root)
+    root.protocol("WM_DELETE_WINDOW", app.on_close)
     root.mainloop()
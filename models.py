@@ -0,0 +1,94 @@
+"""
+Process-level registry of detection models.
+
+Models are loaded once per process, on first use, and shared by every
+NumberPlateDetector. Call preload() before forking worker processes so the
+children inherit the loaded models instead of reading them again.
+"""
+import threading
+
+PLATE_CASCADE = 'haarcascade_russian_plate_number.xml'
+# Used when OpenCV ships without the plate cascade
+FALLBACK_CASCADE = 'haarcascade_frontalface_default.xml'
+
+_lock = threading.Lock()
+_loaders = {}
+_models = {}
+_local = threading.local()
+
+
+def register(name, loader):
+    """Register loader(), called on the first get(name). Replaces any loaded model of that name."""
+    with _lock:
+        _loaders[name] = loader
+        _models.pop(name, None)
+
+
+def get(name):
+    """The loaded model, loading it on first use"""
+    model = _models.get(name)
+    if model is None:
+        with _lock:
+            model = _models.get(name)
+            if model is None:
+                if name not in _loaders:
+                    raise KeyError(f"Unknown model: {name}")
+                model = _models[name] = _loaders[name]()
+    return model
+
+
+def preload(*names):
+    """Load the given models (default: every registered one) now"""
+    for name in names or list(_loaders):
+        get(name)
+
+
+def loaded():
+    return sorted(_models)
+
+
+def clear():
+    """Forget every loaded model, they are reloaded on next use"""
+    with _lock:
+        _models.clear()
+    _local.__dict__.clear()
+
+
+def _load_cascade_xml(filenames=(PLATE_CASCADE, FALLBACK_CASCADE)):
+    """Path and XML text of the first cascade that OpenCV can parse"""
+    import cv2
+    for filename in filenames:
+        path = cv2.data.haarcascades + filename
+        try:
+            with open(path, encoding='utf-8') as f:
+                xml = f.read()
+        except OSError:
+            continue
+        if not _parse_cascade(xml).empty():
+            return {'path': path, 'xml': xml}
+    raise ValueError(f"No usable Haar cascade in {cv2.data.haarcascades}")
+
+
+def _parse_cascade(xml):
+    import cv2
+    storage = cv2.FileStorage(xml, cv2.FILE_STORAGE_READ | cv2.FILE_STORAGE_MEMORY)
+    classifier = cv2.CascadeClassifier()
+    classifier.read(storage.getFirstTopLevelNode())
+    storage.release()
+    return classifier
+
+
+def cascade(name='plate_cascade'):
+    """
+    The named cascade's CascadeClassifier for the calling thread. Classifiers
+    are not safe to share between threads, so each thread parses its own from
+    the XML held by the registry, once, and reuses it for every detector.
+    """
+    classifiers = _local.__dict__.setdefault('cascades', {})
+    classifier = classifiers.get(name)
+    if classifier is None:
+        classifier = classifiers[name] = _parse_cascade(get(name)['xml'])
+    return classifier
+
+
+register('plate_cascade', _load_cascade_xml)
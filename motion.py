@@ -0,0 +1,89 @@
+import cv2
+import numpy as np
+
+
+def merge_regions(regions, gap=0):
+    """Merge [x1, y1, x2, y2] regions that overlap or lie within gap pixels of each other"""
+    regions = [list(region) for region in regions]
+    merged = True
+    while merged and len(regions) > 1:
+        merged = False
+        result = []
+        while regions:
+            current = regions.pop()
+            i = 0
+            while i < len(regions):
+                other = regions[i]
+                if (current[0] <= other[2] + gap and other[0] <= current[2] + gap and
+                        current[1] <= other[3] + gap and other[1] <= current[3] + gap):
+                    current = [min(current[0], other[0]), min(current[1], other[1]),
+                               max(current[2], other[2]), max(current[3], other[3])]
+                    regions.pop(i)
+                    merged = True
+                else:
+                    i += 1
+            result.append(current)
+        regions = result
+    return regions
+
+
+class MotionGate:
+    """
+    Finds moving regions with a MOG2 background subtractor so detection can skip
+    the static parts of a fixed camera's view.
+    Keep one MotionGate per video stream, the background model is stateful.
+    """
+
+    def __init__(self, history=500, var_threshold=16, padding=32, merge_gap=96,
+                 min_region_area=400, scale=0.5, learning_rate=-1):
+        self.history = history
+        self.var_threshold = var_threshold
+        self.subtractor = cv2.createBackgroundSubtractorMOG2(history, var_threshold, False)
+        # Pixels added around every moving region so whole plates fall inside it
+        self.padding = padding
+        # Regions closer than this are merged (plate text and borders move as separate blobs)
+        self.merge_gap = merge_gap
+        # Smallest moving blob (in full-frame pixels) that counts as motion
+        self.min_region_area = min_region_area
+        # Background subtraction runs on a downscaled copy of the frame
+        self.scale = scale
+        self.learning_rate = learning_rate
+        self._kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+
+    def regions(self, frame):
+        """Return padded, merged [x1, y1, x2, y2] regions of the frame that contain motion"""
+        height, width = frame.shape[:2]
+        small = frame
+        if self.scale != 1.0:
+            small = cv2.resize(frame, (max(1, int(width * self.scale)), max(1, int(height * self.scale))),
+                               interpolation=cv2.INTER_AREA)
+
+        mask = self.subtractor.apply(small, learningRate=self.learning_rate)
+
+        # Drop speckle noise, then join nearby blobs
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self._kernel)
+        mask = cv2.dilate(mask, self._kernel, iterations=2)
+
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        scale_x = width / small.shape[1]
+        scale_y = height / small.shape[0]
+        min_area = self.min_region_area / (scale_x * scale_y)
+
+        regions = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            if w * h < min_area:
+                continue
+            regions.append([
+                max(0, int(x * scale_x) - self.padding),
+                max(0, int(y * scale_y) - self.padding),
+                min(width, int(np.ceil((x + w) * scale_x)) + self.padding),
+                min(height, int(np.ceil((y + h) * scale_y)) + self.padding)
+            ])
+
+        return merge_regions(regions, self.merge_gap)
+
+    def reset(self):
+        """Forget the learned background"""
+        self.subtractor = cv2.createBackgroundSubtractorMOG2(self.history, self.var_threshold, False)
@@ -0,0 +1,396 @@
+"""
+Many video sources sharing one pool of detector workers.
+
+Usage:
+    python -m multi_stream cam1.mp4 cam2.mp4 rtsp://10.0.0.5/stream --workers 4 --fps 5
+"""
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+import cv2
+
+from plate_detector import NumberPlateDetector, create_detector
+from frame_reader import FramePacer, FrameReader
+from video_pipeline import FrameQueue, QueueClosed
+from ocr import OcrBatchCollector
+from tracker import PlateTracker
+from motion import MotionGate
+from scheduler import MethodScheduler
+from state_mapper import StateMapper
+from analytics import SightingAnalytics
+
+
+class VideoStream:
+    """
+    One source of an engine: its reader, frame queue, per-camera state and counters.
+
+    fps is the target detection rate. When it is below the source rate, the reader
+    only decodes every Nth frame. weight is the stream's share of the worker pool
+    relative to the other streams when they all have frames waiting.
+
+    policy defaults to 'drop-oldest' for realtime streams and to 'block' otherwise,
+    so a file read as fast as possible waits for the workers instead of dropping frames.
+    """
+
+    def __init__(self, name, source, fps=None, weight=1, policy=None, queue_size=2,
+                 realtime=True, tracking=True, motion_gating=False, budget_ms=None):
+        if weight <= 0:
+            raise ValueError("weight must be positive")
+        self.name = name
+        self.source = source
+        self.target_fps = fps
+        self.weight = weight
+        self.realtime = realtime
+        if policy is None:
+            policy = 'drop-oldest' if realtime else 'block'
+        self.queue = FrameQueue(queue_size, policy)
+
+        # Per-camera state, only ever used by one worker at a time
+        self.tracker = PlateTracker() if tracking else None
+        self.motion_gate = MotionGate() if motion_gating else None
+        self.scheduler = MethodScheduler(budget_ms) if budget_ms is not None else None
+
+        self.reader = None
+        self.error = None
+        self.frames_read = 0
+        self.frames_processed = 0
+        self.detections = 0
+        self.latency_ms = 0.0
+        self.busy = False
+        self.eof = False
+        # Smooth weighted round-robin credit
+        self.credit = 0
+        self._started_at = None
+
+    def open(self):
+        """Open the source and pick the frame stride that meets the FPS target"""
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            raise ValueError(f"Cannot open video source: {self.source}")
+        source_fps = FrameReader(cap).source_fps
+        stride = 1
+        if self.target_fps:
+            stride = max(1, int(round(source_fps / self.target_fps)))
+        self.reader = FrameReader(cap, stride)
+
+    @property
+    def done(self):
+        """True once the source has ended and every queued frame has been processed"""
+        return self.eof and self.queue.depth == 0 and not self.busy
+
+    def stats(self):
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        return {
+            'stream': self.name,
+            'source': self.source,
+            'weight': self.weight,
+            'frame_stride': self.reader.stride if self.reader else None,
+            'frames_read': self.frames_read,
+            'frames_processed': self.frames_processed,
+            'dropped_frames': self.queue.dropped,
+            'queue_depth': self.queue.depth,
+            'detections': self.detections,
+            'processing_fps': self.frames_processed / elapsed if elapsed > 0 else 0.0,
+            'mean_latency_ms': self.latency_ms / self.frames_processed if self.frames_processed else 0.0,
+            'error': self.error
+        }
+
+
+class MultiStreamEngine:
+    """
+    Reader thread per stream -> shared detector worker pool -> tagged results.
+
+    Each stream has its own bounded FrameQueue with a drop policy, so a slow pool
+    drops frames per camera instead of falling behind. Workers pick the next
+    stream by smooth weighted round-robin among streams with a frame waiting;
+    a stream is never processed by two workers at once, so its tracker, motion
+    gate and scheduler see frames in order. Results come out of get_result() as
+    (stream name, frame index, timestamp_ms, detections).
+
+    With ocr_batch_delay (seconds), the workers' crops go through one
+    OcrBatchCollector and are recognized together, across streams, in batches of
+    up to ocr_batch_size; a frame's OCR then waits at most that long for company.
+    """
+
+    def __init__(self, workers=2, detector=None, result_queue_size=64, result_policy='drop-oldest',
+                 ocr_batch_delay=None, ocr_batch_size=32):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.workers = workers
+        self.detector = detector or NumberPlateDetector()
+        self.ocr_batch_delay = ocr_batch_delay
+        self.ocr_batch_size = ocr_batch_size
+        self.ocr_batcher = None
+        self.streams = {}
+        self.result_queue = FrameQueue(result_queue_size, result_policy)
+        self._condition = threading.Condition()
+        self._stop_event = threading.Event()
+        self._threads = []
+        self._active_workers = 0
+
+    def add_stream(self, name, source, **options):
+        """Register a source before start(), options are passed to VideoStream"""
+        if name in self.streams:
+            raise ValueError(f"Duplicate stream name: {name}")
+        stream = VideoStream(name, source, **options)
+        self.streams[name] = stream
+        return stream
+
+    def start(self):
+        for stream in self.streams.values():
+            try:
+                stream.open()
+            except ValueError as e:
+                stream.error = str(e)
+                stream.eof = True
+                continue
+            stream._started_at = time.monotonic()
+            self._threads.append(threading.Thread(target=self._read_loop, args=(stream,), daemon=True))
+
+        if self.ocr_batch_delay:
+            self.ocr_batcher = OcrBatchCollector(self.detector.extract_text_batch,
+                                                 self.ocr_batch_size, self.ocr_batch_delay)
+            self.detector.ocr_batcher = self.ocr_batcher
+
+        self._active_workers = self.workers
+        for _ in range(self.workers):
+            self._threads.append(threading.Thread(target=self._worker_loop, daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=2.0):
+        self._stop_event.set()
+        for stream in self.streams.values():
+            stream.queue.close()
+        self.result_queue.close()
+        with self._condition:
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        if self.ocr_batcher is not None:
+            self.detector.ocr_batcher = None
+            self.ocr_batcher.close()
+        for stream in self.streams.values():
+            if stream.reader is not None:
+                stream.reader.release()
+
+    def get_result(self, timeout=None):
+        """Next tagged result. Raises queue.Empty on timeout and QueueClosed when every stream has ended."""
+        return self.result_queue.get(timeout)
+
+    def results(self):
+        """Iterate over tagged results until every stream has ended"""
+        while True:
+            try:
+                yield self.get_result()
+            except QueueClosed:
+                return
+
+    def stats(self):
+        """Per-stream counters, keyed by stream name"""
+        return {name: stream.stats() for name, stream in self.streams.items()}
+
+    def ocr_stats(self):
+        """Batches and crops recognized through the OCR collector, None without one"""
+        if self.ocr_batcher is None:
+            return None
+        batcher = self.ocr_batcher
+        return {'batches': batcher.batches, 'crops': batcher.items,
+                'mean_batch': batcher.items / batcher.batches if batcher.batches else 0.0}
+
+    def _read_loop(self, stream):
+        reader = stream.reader
+        pacer = FramePacer(reader.fps, self._stop_event)
+        try:
+            while not self._stop_event.is_set():
+                if stream.realtime and not pacer.wait():
+                    break
+
+                ret, frame = reader.read()
+                if not ret:
+                    break
+                stream.frames_read += 1
+                item = (reader.frame_index, reader.timestamp_ms, time.monotonic(), frame)
+                if not stream.queue.put(item):
+                    break
+                with self._condition:
+                    self._condition.notify()
+        finally:
+            with self._condition:
+                stream.eof = True
+                self._condition.notify_all()
+
+    def _next_stream(self):
+        """Smooth weighted round-robin over the idle streams with a frame waiting"""
+        ready = [stream for stream in self.streams.values() if not stream.busy and stream.queue.depth]
+        if not ready:
+            return None
+        total = 0
+        for stream in ready:
+            stream.credit += stream.weight
+            total += stream.weight
+        chosen = max(ready, key=lambda stream: stream.credit)
+        chosen.credit -= total
+        return chosen
+
+    def _worker_loop(self):
+        try:
+            while not self._stop_event.is_set():
+                with self._condition:
+                    stream = self._next_stream()
+                    while stream is None:
+                        if all(s.done for s in self.streams.values()) or self._stop_event.is_set():
+                            return
+                        self._condition.wait(0.1)
+                        stream = self._next_stream()
+                    stream.busy = True
+                    try:
+                        item = stream.queue.get(0)
+                    except (queue.Empty, QueueClosed):
+                        stream.busy = False
+                        continue
+
+                index, timestamp_ms, queued_at, frame = item
+                detections = None
+                try:
+                    detections = self.detector.detect_plates(frame, tracker=stream.tracker,
+                                                             motion_gate=stream.motion_gate,
+                                                             scheduler=stream.scheduler)
+                finally:
+                    # Counters and the result go out before the stream is released,
+                    # so its next frame cannot be processed alongside or ahead of this one
+                    with self._condition:
+                        if detections is not None:
+                            stream.detections += len(detections)
+                            stream.latency_ms += (time.monotonic() - queued_at) * 1000
+                            self.result_queue.put((stream.name, index, timestamp_ms, detections))
+                        stream.frames_processed += 1
+                        stream.busy = False
+                        self._condition.notify_all()
+        finally:
+            with self._condition:
+                self._active_workers -= 1
+                last_worker = self._active_workers == 0
+            if last_worker:
+                self.result_queue.close()
+
+
+def _stream_name(source, taken):
+    base = os.path.splitext(os.path.basename(source.rstrip('/')))[0] or 'stream'
+    name, n = base, 1
+    while name in taken:
+        n += 1
+        name = f"{base}-{n}"
+    return name
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='multi_stream',
+                                     description="Number plate detection on many video streams")
+    parser.add_argument('sources', nargs='+', help="Video files or stream URLs, optionally as name=source")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help="Detector worker threads shared by all streams")
+    parser.add_argument('--fps', type=float, help="Target detection FPS per stream (default: source FPS)")
+    parser.add_argument('--weights', help="Comma separated scheduling weight per source (default: equal)")
+    parser.add_argument('--policy', choices=['block', 'drop-oldest', 'latest-wins'],
+                        help="What a stream's reader does when its queue is full "
+                             "(default: drop-oldest, or block with --no-realtime)")
+    parser.add_argument('--queue-size', type=int, default=2, help="Frames queued per stream")
+    parser.add_argument('--no-realtime', action='store_true',
+                        help="Read files as fast as the workers keep up instead of at the source FPS")
+    parser.add_argument('--motion-gating', action='store_true', help="Only search moving regions")
+    parser.add_argument('--budget-ms', type=float, help="Per-frame detection budget for adaptive scheduling")
+    parser.add_argument('--detection-scale', type=float, default=1.0,
+                        help="Search for plates on a copy downscaled by this factor")
+    parser.add_argument('--ocr-batch-ms', type=float, default=0,
+                        help="Recognize the workers' crops together, waiting at most this long for a batch (0: off)")
+    parser.add_argument('--db', help="Also store sightings in this SQLite database")
+    parser.add_argument('--stats-interval', type=float, default=0,
+                        help="Print per-stream stats and sighting analytics to stderr every N seconds (0: only at the end)")
+    args = parser.parse_args(argv)
+    if args.workers < 1 or args.queue_size < 1:
+        parser.error("--workers and --queue-size must be at least 1")
+    if args.fps is not None and args.fps <= 0:
+        parser.error("--fps must be positive")
+    if args.ocr_batch_ms < 0:
+        parser.error("--ocr-batch-ms must not be negative")
+    if not 0 < args.detection_scale <= 1:
+        parser.error("--detection-scale must be in (0, 1]")
+    if args.weights:
+        try:
+            args.weights = [float(w) for w in args.weights.split(',')]
+        except ValueError:
+            parser.error("--weights must be comma separated numbers")
+        if len(args.weights) != len(args.sources) or min(args.weights) <= 0:
+            parser.error("--weights needs one positive weight per source")
+    else:
+        args.weights = [1] * len(args.sources)
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    detector = create_detector(args.detection_scale)
+    engine = MultiStreamEngine(workers=args.workers, detector=detector,
+                               ocr_batch_delay=args.ocr_batch_ms / 1000 or None)
+    for source, weight in zip(args.sources, args.weights):
+        name, sep, location = source.partition('=')
+        if not sep or '://' in name:
+            name, location = _stream_name(source, engine.streams), source
+        engine.add_stream(name, location, fps=args.fps, weight=weight, policy=args.policy,
+                          queue_size=args.queue_size, realtime=not args.no_realtime,
+                          motion_gating=args.motion_gating, budget_ms=args.budget_ms)
+
+    state_mapper = StateMapper()
+    store = None
+    if args.db:
+        from detection_store import SqliteDetectionStore
+        store = SqliteDetectionStore(args.db, state_mapper=state_mapper)
+    analytics = SightingAnalytics(state_mapper)
+    engine.start()
+    last_stats = time.monotonic()
+    try:
+        for stream_name, index, timestamp_ms, detections in engine.results():
+            if store is not None:
+                store.add(detections, stream=stream_name, frame=index)
+            analytics.add_detections(detections, stream=stream_name)
+            for detection in detections:
+                x1, y1, x2, y2 = (int(v) for v in detection['bbox'])
+                record = {
+                    'stream': stream_name,
+                    'frame': index,
+                    'timestamp_ms': round(timestamp_ms, 1),
+                    'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2,
+                    'confidence': round(float(detection['confidence']), 4),
+                    'method': detection['method'],
+                    'text': detection.get('text', ''),
+                    'track_id': detection.get('track_id')
+                }
+                sys.stdout.write(json.dumps(record) + '\n')
+            sys.stdout.flush()
+            if args.stats_interval and time.monotonic() - last_stats >= args.stats_interval:
+                last_stats = time.monotonic()
+                print(json.dumps({'streams': engine.stats(), 'analytics': analytics.summary()}),
+                      file=sys.stderr)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.stop()
+        detector.close()
+        if store is not None:
+            store.close()
+    summary = {'streams': engine.stats(), 'analytics': analytics.summary()}
+    if engine.ocr_batcher is not None:
+        summary['ocr_batches'] = engine.ocr_stats()
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
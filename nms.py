@@ -0,0 +1,78 @@
+import numpy as np
+
+OVERLAP_METRICS = ('iou', 'min')
+
+
+def box_overlaps(boxes_a, boxes_b, metric='iou'):
+    """
+    Overlap matrix between an (N, 4) and an (M, 4) array of [x1, y1, x2, y2] boxes.
+    metric 'iou' is intersection over union, 'min' is intersection over the smaller area.
+    """
+    if metric not in OVERLAP_METRICS:
+        raise ValueError(f"Unknown overlap metric: {metric}")
+
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(1, -1, 4)
+    overlap_x = np.maximum(0, np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]))
+    overlap_y = np.maximum(0, np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]))
+    intersection = overlap_x * overlap_y
+
+    areas_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    areas_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    if metric == 'iou':
+        denominator = areas_a + areas_b - intersection
+    else:
+        denominator = np.minimum(areas_a, areas_b)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, intersection / denominator, 0.0)
+
+
+def non_max_suppression(boxes, scores, threshold=0.5, metric='min', weights=None):
+    """
+    Greedy non-maximum suppression.
+
+    boxes: (N, 4) array of [x1, y1, x2, y2]
+    scores: (N,) array of confidences
+    threshold: boxes overlapping a kept box by more than this are suppressed
+    metric: 'iou' or 'min' (intersection over the smaller area)
+    weights: optional (N,) multipliers applied to scores, e.g. per detection method
+
+    Returns the indices of the kept boxes, highest weighted score first.
+    """
+    if metric not in OVERLAP_METRICS:
+        raise ValueError(f"Unknown overlap metric: {metric}")
+
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    scores = np.asarray(scores, dtype=np.float64).reshape(-1)
+    if len(boxes) != len(scores):
+        raise ValueError("boxes and scores must have the same length")
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.intp)
+    if weights is not None:
+        scores = scores * np.asarray(weights, dtype=np.float64).reshape(-1)
+
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+
+    # Stable sort keeps the original order between equal scores
+    order = np.argsort(-scores, kind='stable')
+    keep = []
+    while order.size > 0:
+        current = order[0]
+        keep.append(current)
+        rest = order[1:]
+
+        overlap_x = np.maximum(0, np.minimum(x2[current], x2[rest]) - np.maximum(x1[current], x1[rest]))
+        overlap_y = np.maximum(0, np.minimum(y2[current], y2[rest]) - np.maximum(y1[current], y1[rest]))
+        intersection = overlap_x * overlap_y
+
+        if metric == 'iou':
+            denominator = areas[current] + areas[rest] - intersection
+        else:
+            denominator = np.minimum(areas[current], areas[rest])
+
+        # Compare without dividing so empty boxes never count as duplicates
+        order = rest[intersection <= threshold * denominator]
+
+    return np.array(keep, dtype=np.intp)
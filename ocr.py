@@ -0,0 +1,253 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import cv2
+import numpy as np
+
+
+# Crops are normalized to this height for batched recognition
+OCR_HEIGHT = 50
+# Widest normalized crop (plates are at most 5:1, this leaves room for loose boxes)
+OCR_MAX_WIDTH = 8 * OCR_HEIGHT
+
+
+def normalize_batch(crops, height=OCR_HEIGHT, max_width=OCR_MAX_WIDTH):
+    """
+    Normalize plate crops for batched OCR: grayscale, resize to a fixed height and
+    Otsu threshold them, packed left-aligned into one contiguous (N, height, W)
+    uint8 array. Returns the batch and the valid width of every row.
+    """
+    grays = []
+    widths = np.empty(len(crops), dtype=np.intp)
+    for i, crop in enumerate(crops):
+        gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if len(crop.shape) == 3 else crop
+        crop_height, crop_width = gray.shape
+        width = min(max_width, max(1, int(round(crop_width * height / crop_height))))
+        grays.append(cv2.resize(gray, (width, height)))
+        widths[i] = width
+
+    batch = np.zeros((len(crops), height, int(widths.max()) if len(crops) else 0), dtype=np.uint8)
+    for i, gray in enumerate(grays):
+        batch[i, :, :widths[i]] = gray
+
+    # Otsu threshold for every crop at once, then binarize the whole batch in one step
+    valid = np.arange(batch.shape[2])[None, None, :] < widths[:, None, None]
+    thresholds = otsu_thresholds(batch, widths)
+    return np.where(valid & (batch > thresholds[:, None, None]), 255, 0).astype(np.uint8), widths
+
+
+def otsu_thresholds(batch, widths):
+    """Per-crop Otsu thresholds of an (N, H, W) batch, ignoring the padding past each width"""
+    count, height, width = batch.shape
+    valid = np.broadcast_to(np.arange(width)[None, None, :] < widths[:, None, None], batch.shape)
+
+    # One bincount builds all N histograms: crop i uses bins [256 * i, 256 * (i + 1))
+    offsets = (np.arange(count, dtype=np.intp) * 256)[:, None, None]
+    histograms = np.bincount((batch + offsets)[valid], minlength=count * 256).reshape(count, 256)
+
+    probabilities = histograms / np.maximum(histograms.sum(axis=1, keepdims=True), 1)
+    omega = np.cumsum(probabilities, axis=1)
+    mu = np.cumsum(probabilities * np.arange(256), axis=1)
+    mu_total = mu[:, -1:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        between_class = (mu_total * omega - mu) ** 2 / (omega * (1.0 - omega))
+    between_class = np.nan_to_num(between_class, nan=0.0, posinf=0.0, neginf=0.0)
+    return np.argmax(between_class, axis=1)
+
+
+def dhash(image, hash_size=16):
+    """
+    Difference hash of a grayscale or binary image.
+    Each bit says whether a pixel is brighter than its right neighbour on a
+    (hash_size + 1) x hash_size thumbnail, so small shifts, noise and
+    brightness changes map to the same value.
+    """
+    thumbnail = cv2.resize(image, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (thumbnail[:, 1:] > thumbnail[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def crop_key(image, hash_size=16):
+    """Cache key for a normalized plate crop: its dHash plus a coarse aspect ratio"""
+    height, width = image.shape[:2]
+    return dhash(image, hash_size), int(round(4 * width / max(height, 1)))
+
+
+def hamming_distance(a, b):
+    return _popcount(a ^ b)
+
+
+try:
+    _popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+    def _popcount(value):
+        return bin(value).count('1')
+
+
+class OcrCache:
+    """
+    LRU cache of OCR results keyed by crop_key() with a time-to-live.
+    A lookup that misses exactly falls back to the closest entry with the same
+    aspect bucket within max_distance bits, so near-identical crops still hit.
+    Counts hits, misses, evictions and expirations; safe to share between threads.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60.0, max_distance=10):
+        self.maxsize = maxsize
+        # Seconds an entry stays valid (None keeps entries until evicted)
+        self.ttl = ttl
+        # Hamming distance (of the 256 bit hash) still treated as the same crop, 0 for exact only
+        self.max_distance = max_distance
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the cached text for key, or None on a miss"""
+        with self._lock:
+            now = time.monotonic()
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is not None and entry[1] < now:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+
+            if entry is None and self.max_distance > 0:
+                key = self._nearest(key, now)
+                if key is not None:
+                    entry = self._entries[key]
+
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def _nearest(self, key, now):
+        """Closest live entry within max_distance, scanning from the most recently used"""
+        crop_hash, aspect = key
+        best, best_distance = None, self.max_distance + 1
+        for candidate in reversed(self._entries):
+            if candidate[1] != aspect:
+                continue
+            expires = self._entries[candidate][1]
+            if expires is not None and expires < now:
+                continue
+            distance = hamming_distance(crop_hash, candidate[0])
+            if distance < best_distance:
+                best, best_distance = candidate, distance
+                if distance == 0:
+                    break
+        return best
+
+    def put(self, key, text):
+        with self._lock:
+            expires = None if self.ttl is None else time.monotonic() + self.ttl
+            self._entries[key] = (text, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+
+class OcrBatchCollector:
+    """
+    Gathers crops, possibly across consecutive frames, and recognizes them in
+    batches of up to batch_size, or whatever has arrived once the oldest crop
+    has waited max_delay seconds.
+
+    recognize_batch is a callable taking a list of crops and returning a list of
+    texts, e.g. NumberPlateDetector.extract_text_batch. submit() returns a
+    Future resolved with the crop's text.
+    """
+
+    def __init__(self, recognize_batch, batch_size=32, max_delay=0.05):
+        self.recognize_batch = recognize_batch
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.batches = 0
+        self.items = 0
+        # (crop, future, enqueue time) in arrival order
+        self._pending = []
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, crop):
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("OcrBatchCollector is closed")
+            self._pending.append((crop, future, time.monotonic()))
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify_all()
+            elif len(self._pending) == 1:
+                # Wake the worker so it starts the deadline for this batch
+                self._condition.notify_all()
+        return future
+
+    def close(self):
+        """Recognize whatever is still pending and stop the worker"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+
+    def _take_batch(self):
+        with self._condition:
+            while True:
+                if self._pending:
+                    waited = time.monotonic() - self._pending[0][2]
+                    if (len(self._pending) >= self.batch_size or waited >= self.max_delay
+                            or self._closed):
+                        batch = self._pending[:self.batch_size]
+                        self._pending = self._pending[self.batch_size:]
+                        return batch
+                    self._condition.wait(self.max_delay - waited)
+                elif self._closed:
+                    return None
+                else:
+                    self._condition.wait()
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            crops = [crop for crop, _, _ in batch]
+            try:
+                texts = self.recognize_batch(crops)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future, _), text in zip(batch, texts):
+                future.set_result(text)
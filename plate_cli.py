@@ -0,0 +1,261 @@
+"""
+Headless batch processing for images and videos.
+
+Usage:
+    python -m plate_cli images/ "archive/**/*.jpg" clip.mp4 --workers 8 --format jsonl
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+from plate_detector import create_detector
+from frame_reader import FrameReader
+import models
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif'}
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv'}
+
+CSV_FIELDS = ['source', 'frame', 'timestamp_ms', 'x1', 'y1', 'x2', 'y2',
+              'confidence', 'method', 'text', 'error']
+
+# One detector per worker process, created by _init_worker
+_detector = None
+
+
+def _init_worker(detection_scale=1.0):
+    global _detector
+    _detector = create_detector(detection_scale, worker=True)
+
+
+def _records(source, detections, frame=None, timestamp_ms=None):
+    records = []
+    for detection in detections:
+        x1, y1, x2, y2 = (int(v) for v in detection['bbox'])
+        records.append({
+            'source': source,
+            'frame': frame,
+            'timestamp_ms': timestamp_ms,
+            'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2,
+            'confidence': round(float(detection['confidence']), 4),
+            'method': detection['method'],
+            'text': detection.get('text', '')
+        })
+    return records
+
+
+def process_images(paths):
+    """Worker task: detect plates in a chunk of image files"""
+    records = []
+    for path in paths:
+        frame = cv2.imread(path)
+        if frame is None:
+            records.append({'source': path, 'error': 'unreadable image'})
+            continue
+        records.extend(_records(path, _detector.detect_plates(frame)))
+    return records
+
+
+def process_video_segment(path, start, end, stride):
+    """Worker task: detect plates in frames [start, end) of a video, every stride-th frame"""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        return [{'source': path, 'error': 'unreadable video'}]
+
+    records = []
+    try:
+        # Skipped frames are only grabbed, not decoded
+        reader = FrameReader(cap, stride, start, end)
+        for index, frame in reader:
+            timestamp_ms = round(reader.timestamp_ms, 1)
+            records.extend(_records(path, _detector.detect_plates(frame), index, timestamp_ms))
+    finally:
+        cap.release()
+    return records
+
+
+def expand_inputs(inputs, recursive=False):
+    """Expand directories and glob patterns into image and video file lists"""
+    images, videos = [], []
+    seen = set()
+
+    def add(path):
+        if path in seen or not os.path.isfile(path):
+            return
+        extension = os.path.splitext(path)[1].lower()
+        if extension in IMAGE_EXTENSIONS:
+            images.append(path)
+        elif extension in VIDEO_EXTENSIONS:
+            videos.append(path)
+        else:
+            return
+        seen.add(path)
+
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, '**', '*') if recursive else os.path.join(item, '*')
+            for path in sorted(glob.glob(pattern, recursive=recursive)):
+                add(path)
+        elif glob.has_magic(item):
+            for path in sorted(glob.glob(item, recursive=True)):
+                add(path)
+        else:
+            if not os.path.exists(item):
+                print(f"Warning: {item} not found", file=sys.stderr)
+            add(item)
+
+    return images, videos
+
+
+def build_tasks(images, videos, chunk_size, stride, start_s=None, end_s=None):
+    """
+    Split the work into (function, args) tasks of roughly chunk_size frames each.
+    Videos are limited to the [start_s, end_s) time range when given.
+    """
+    tasks = []
+    for i in range(0, len(images), chunk_size):
+        tasks.append((process_images, (images[i:i + chunk_size],)))
+
+    for path in videos:
+        cap = cv2.VideoCapture(path)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) if cap.isOpened() else 0
+        reader = FrameReader.from_time_range(cap, stride, start_s, end_s)
+        first, last = reader.start_frame, reader.end_frame
+        cap.release()
+
+        if frame_count > 0:
+            last = frame_count if last is None else min(last, frame_count)
+        if last is None:
+            # Unknown length, process the whole range in one task
+            tasks.append((process_video_segment, (path, first, None, stride)))
+            continue
+
+        # Segments are a whole number of strides long so sampling stays aligned
+        segment = chunk_size * stride
+        for start in range(first, last, segment):
+            tasks.append((process_video_segment, (path, start, min(start + segment, last), stride)))
+    return tasks
+
+
+def run_tasks(executor, tasks, ordered=True, max_pending=8):
+    """
+    Yield task results, in submission order if ordered, otherwise as they complete.
+    At most max_pending tasks are in flight so results never pile up in memory.
+    """
+    remaining = iter(tasks)
+    pending = deque()
+
+    def submit_next():
+        task = next(remaining, None)
+        if task is None:
+            return False
+        func, args = task
+        pending.append(executor.submit(func, *args))
+        return True
+
+    for _ in range(max_pending):
+        if not submit_next():
+            break
+
+    if ordered:
+        while pending:
+            future = pending.popleft()
+            result = future.result()
+            submit_next()
+            yield result
+    else:
+        while pending:
+            future = next(as_completed(pending))
+            pending.remove(future)
+            submit_next()
+            yield future.result()
+
+
+class JsonLinesWriter:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, record):
+        self.stream.write(json.dumps(record) + '\n')
+
+
+class CsvWriter:
+    def __init__(self, stream):
+        self.writer = csv.DictWriter(stream, fieldnames=CSV_FIELDS, extrasaction='ignore')
+        self.writer.writeheader()
+
+    def write(self, record):
+        self.writer.writerow(record)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='plate_cli', description="Headless number plate detection")
+    parser.add_argument('inputs', nargs='+', help="Image/video files, directories or glob patterns")
+    parser.add_argument('-o', '--output', help="Output file (default: stdout)")
+    parser.add_argument('-f', '--format', choices=['jsonl', 'csv'], default='jsonl')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help="Number of worker processes")
+    parser.add_argument('--chunk-size', type=int, default=16,
+                        help="Images, or sampled video frames, per task")
+    parser.add_argument('--stride', type=int, default=1, help="Process every Nth video frame")
+    parser.add_argument('--start', type=float, help="Video start offset in seconds")
+    parser.add_argument('--end', type=float, help="Video end offset in seconds")
+    parser.add_argument('--unordered', action='store_true',
+                        help="Write results as soon as they are ready instead of in input order")
+    parser.add_argument('--detection-scale', type=float, default=1.0,
+                        help="Search for plates on a copy downscaled by this factor (e.g. 0.5 for 4K)")
+    parser.add_argument('--summary', action='store_true',
+                        help="Print sighting analytics (unique plates, states, top plates) to stderr at the end")
+    parser.add_argument('-r', '--recursive', action='store_true', help="Recurse into directories")
+    args = parser.parse_args(argv)
+    if args.workers < 1 or args.chunk_size < 1 or args.stride < 1:
+        parser.error("--workers, --chunk-size and --stride must be at least 1")
+    if not 0 < args.detection_scale <= 1:
+        parser.error("--detection-scale must be in (0, 1]")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    images, videos = expand_inputs(args.inputs, args.recursive)
+    if not images and not videos:
+        print("No images or videos found", file=sys.stderr)
+        return 1
+    tasks = build_tasks(images, videos, args.chunk_size, args.stride, args.start, args.end)
+
+    analytics = None
+    if args.summary:
+        from analytics import SightingAnalytics
+        from state_mapper import StateMapper
+        analytics = SightingAnalytics(StateMapper())
+    stream = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        writer = CsvWriter(stream) if args.format == 'csv' else JsonLinesWriter(stream)
+        # Forked workers inherit the loaded models instead of each reading them
+        models.preload()
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                                 initargs=(args.detection_scale,)) as executor:
+            for records in run_tasks(executor, tasks, ordered=not args.unordered,
+                                     max_pending=args.workers * 4):
+                for record in records:
+                    writer.write(record)
+                    if analytics is not None:
+                        analytics.add(record.get('text'))
+                stream.flush()
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    if analytics is not None:
+        print(json.dumps(analytics.summary(), indent=2), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
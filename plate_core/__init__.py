@@ -0,0 +1,49 @@
+"""
+Headless core of the number plate detection system.
+
+Everything here is usable without Tk or PIL. Names are imported on first
+access, so `import plate_core` is instant and a worker only pays for what it
+uses: StateMapper or Watchlist never load OpenCV, NumberPlateDetector does.
+
+    from plate_core import NumberPlateDetector, StateMapper
+"""
+import importlib
+
+# Public name -> module it lives in
+_EXPORTS = {
+    'NumberPlateDetector': 'plate_detector',
+    'StateMapper': 'state_mapper',
+    'Watchlist': 'watchlist',
+    'normalize_plate': 'watchlist',
+    'plate_distance': 'watchlist',
+    'PlateTracker': 'tracker',
+    'MotionGate': 'motion',
+    'MethodScheduler': 'scheduler',
+    'OcrCache': 'ocr',
+    'DetectorProfiler': 'profiling',
+    'SightingAnalytics': 'analytics',
+    'MemoryDetectionStore': 'detection_store',
+    'SqliteDetectionStore': 'detection_store',
+    'FrameReader': 'frame_reader',
+    'VideoPipeline': 'video_pipeline',
+    'ProcessVideoPipeline': 'video_pipeline',
+    'MultiStreamEngine': 'multi_stream',
+    'models': 'models',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(module_name)
+    value = module if name == module_name else getattr(module, name)
+    # Cache it, later lookups do not come back here
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,66 +1,380 @@
 import cv2
 import numpy as np
 import re
-from PIL import Image
 import time
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from preprocessing import FramePreprocessor, FrameContext
+from nms import non_max_suppression, box_overlaps
+from tracker import crop_quality
+from ocr import OcrCache, crop_key, normalize_batch
+import models
 
 class NumberPlateDetector:
-    def __init__(self):
-        # Initialize cascade classifier for license plate detection
-        self.plate_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_russian_plate_number.xml')
-        if self.plate_cascade.empty():
-            # Fallback to frontal face cascade if plate cascade not available
-            self.plate_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    def __init__(self, seed=None):
+        # Source of the simulated confidences and OCR results, seed it for reproducible runs
+        self.rng = random.Random(seed)
+        
+        # Cascade classifier for license plate detection, from the process-wide model registry.
+        # It is loaded on first use and shared with every other detector in the process.
+        self.cascade_model = 'plate_cascade'
         
         # Initialize contour-based detection parameters
         self.min_area = 500
         self.max_area = 50000
         
-    def detect_plates(self, frame):
+        # Candidate search runs on a copy downscaled by this factor, boxes are
+        # then mapped back and refined at full resolution (1.0 disables)
+        self.detection_scale = 1.0
+        
+        # Split large frames into overlapping tiles searched in parallel on a thread pool.
+        # Sizes are in pixels of the searched image; overlap should exceed the widest plate.
+        self.tile_size = None  # e.g. 1024 (None disables tiling)
+        self.tile_overlap = 256
+        self.tile_workers = None  # None uses one thread per CPU
+        self._tile_pool = None
+        # The detector may be shared by worker threads, only one of them creates the pool
+        self._tile_pool_lock = threading.Lock()
+        
+        # Shared per-frame preprocessing (grayscale, blur, edges)
+        self.preprocessor = FramePreprocessor()
+        
+        # Other threads (tile workers, pipeline workers) get their own cascade and buffers
+        self._owner_thread = threading.get_ident()
+        self._local = threading.local()
+        
+        # Duplicate removal settings ('min' = overlap over the smaller area, or 'iou')
+        self.nms_metric = 'min'
+        self.nms_threshold = 0.5
+        self.method_weights = None  # e.g. {'cascade': 1.2} to prefer cascade boxes
+        
+        # Optional DetectorProfiler collecting per-stage timings and candidate counts
+        self.profiler = None
+        
+        # Optional OcrCache so near-identical crops skip the recognizer
+        self.ocr_cache = None
+        
+        # Optional OcrBatchCollector: crops of concurrent detect_plates calls
+        # (e.g. the workers of a MultiStreamEngine) are recognized together
+        self.ocr_batcher = None
+        
+    def detect_plates(self, frame, tracker=None, motion_gate=None, scheduler=None):
         """
         Detect number plates using multiple methods:
         1. Haar cascade classifier
         2. Contour detection with morphological operations
         3. Edge detection with rectangle finding
+        
+        When a PlateTracker is given, detections carry a 'track_id' and OCR only
+        runs for new tracks, better quality crops or after the tracker's interval.
+        When a MotionGate is given, the methods only run inside moving regions and
+        frames without motion skip detection entirely.
+        When a MethodScheduler is given, methods run cheapest-useful first and are
+        skipped when they would overrun its per-frame budget.
+        """
+        if self.profiler is not None:
+            self.profiler.begin_frame()
+        plan = scheduler.begin_frame() if scheduler is not None else None
+        
+        if motion_gate is None:
+            results = self._search(frame, self._thread_preprocessor(), plan)
+        else:
+            results = []
+            with self._stage('motion'):
+                regions = motion_gate.regions(frame)
+            for x1, y1, x2, y2 in regions:
+                region_results = self._search(frame[y1:y2, x1:x2], plan=plan)
+                
+                # Map region boxes back to full-frame coordinates
+                for result in region_results:
+                    bx1, by1, bx2, by2 = result['bbox']
+                    result['bbox'] = [bx1 + x1, by1 + y1, bx2 + x1, by2 + y1]
+                results.extend(region_results)
+        
+        # Remove duplicate detections
+        self._count('candidates', len(results))
+        with self._stage('dedup'):
+            results = self._remove_duplicates(results)
+        self._count('detections', len(results))
+        if scheduler is not None:
+            scheduler.end_frame(plan, results)
+        
+        # Tighten boxes found on the downscaled copy against the full resolution frame
+        if self.detection_scale < 1.0:
+            with self._stage('refine'):
+                for result in results:
+                    result['bbox'] = self._refine_box(frame, result['bbox'])
+        
+        # Associate detections with tracks across frames
+        tracks = tracker.update(results) if tracker is not None else None
+        
+        # Extract text from detected regions, all crops of the frame in one batch
+        with self._stage('ocr'):
+            pending = []
+            for i, result in enumerate(results):
+                x1, y1, x2, y2 = result['bbox']
+                crop_img = frame[y1:y2, x1:x2]
+                if crop_img.size > 0:
+                    if tracks is None:
+                        pending.append((result, crop_img, None, None))
+                    else:
+                        track = tracks[i]
+                        quality = crop_quality(crop_img)
+                        if tracker.needs_ocr(track, quality):
+                            pending.append((result, crop_img, track, quality))
+                        else:
+                            result['text'] = track.text
+            
+            texts = self._read_texts([crop for _, crop, _, _ in pending])
+            for (result, _, track, quality), text in zip(pending, texts):
+                if track is None:
+                    result['text'] = text
+                else:
+                    tracker.record_text(track, text, quality)
+                    result['text'] = track.text
+        
+        if self.profiler is not None:
+            self.profiler.end_frame()
+        
+        return results
+    
+    def detect_plates_batch(self, frames):
+        """
+        detect_plates for a batch of independent frames (no tracking, motion
+        gating or scheduling). The crops of every frame are recognized in one
+        extract_text_batch call. Returns one result list per frame.
         """
+        batch_results = []
+        pending = []
+        for frame in frames:
+            if self.profiler is not None:
+                self.profiler.begin_frame()
+            results = self._search(frame, self._thread_preprocessor())
+            self._count('candidates', len(results))
+            with self._stage('dedup'):
+                results = self._remove_duplicates(results)
+            self._count('detections', len(results))
+            if self.detection_scale < 1.0:
+                with self._stage('refine'):
+                    for result in results:
+                        result['bbox'] = self._refine_box(frame, result['bbox'])
+            for result in results:
+                x1, y1, x2, y2 = result['bbox']
+                crop_img = frame[y1:y2, x1:x2]
+                if crop_img.size > 0:
+                    pending.append((result, crop_img))
+            if self.profiler is not None:
+                self.profiler.end_frame()
+            batch_results.append(results)
+        
+        texts = self.extract_text_batch([crop for _, crop in pending])
+        for (result, _), text in zip(pending, texts):
+            result['text'] = text
+        return batch_results
+    
+    def _search(self, frame, preprocessor=None, plan=None):
+        """
+        Find candidates in a frame (or region), on a downscaled copy when
+        detection_scale < 1, and return them in the frame's coordinates
+        """
+        scale = self.detection_scale
+        search_frame = frame
+        if scale < 1.0:
+            height, width = frame.shape[:2]
+            size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+            search_frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        else:
+            scale = 1.0
+        
+        height, width = search_frame.shape[:2]
+        if self.tile_size and (height > self.tile_size or width > self.tile_size):
+            results = self._detect_tiled(search_frame, scale, plan)
+        else:
+            # Intermediates are computed once and shared by all methods
+            if preprocessor is not None:
+                context = preprocessor.prepare(search_frame, scale)
+            else:
+                context = FrameContext(search_frame, scale=scale)
+            results = self._detect_candidates(search_frame, context, plan)
+        
+        if scale != 1.0:
+            height, width = frame.shape[:2]
+            for result in results:
+                x1, y1, x2, y2 = result['bbox']
+                result['bbox'] = [max(0, int(x1 / scale)), max(0, int(y1 / scale)),
+                                  min(width, int(np.ceil(x2 / scale))), min(height, int(np.ceil(y2 / scale)))]
+        return results
+    
+    def _tiles(self, height, width):
+        """Overlapping [x1, y1, x2, y2] tiles covering an image"""
+        size = self.tile_size
+        step = max(1, size - self.tile_overlap)
+        
+        def starts(length):
+            positions = list(range(0, max(length - size, 0) + 1, step))
+            if positions[-1] + size < length:
+                positions.append(length - size)
+            return positions
+        
+        return [(x, y, min(x + size, width), min(y + size, height))
+                for y in starts(height) for x in starts(width)]
+    
+    def _detect_tiled(self, frame, scale, plan=None):
+        """Run the detection methods on overlapping tiles in parallel and merge the results"""
+        height, width = frame.shape[:2]
+        tiles = self._tiles(height, width)
+        
+        with self._tile_pool_lock:
+            if self._tile_pool is None:
+                self._tile_pool = ThreadPoolExecutor(max_workers=self.tile_workers,
+                                                     thread_name_prefix='plate-tile')
+            tile_pool = self._tile_pool
+        frame_record = self.profiler.current_frame() if self.profiler is not None else None
+        futures = [tile_pool.submit(self._detect_tile, frame, tile, scale, frame_record, plan)
+                   for tile in tiles]
+        
         results = []
+        for (x1, y1, x2, y2), future in zip(tiles, futures):
+            for result in future.result():
+                bx1, by1, bx2, by2 = result['bbox']
+                
+                # Boxes cut by an inner tile edge are partial, an overlapping tile holds the whole plate
+                if ((bx1 <= 1 and x1 > 0) or (by1 <= 1 and y1 > 0) or
+                        (bx2 >= x2 - x1 - 1 and x2 < width) or (by2 >= y2 - y1 - 1 and y2 < height)):
+                    continue
+                
+                result['bbox'] = [bx1 + x1, by1 + y1, bx2 + x1, by2 + y1]
+                results.append(result)
         
-        # Method 1: Haar Cascade Detection
-        cascade_results = self._detect_with_cascade(frame)
-        results.extend(cascade_results)
+        # Duplicates across tiles are removed with the rest in detect_plates
+        return results
+    
+    def _detect_tile(self, frame, tile, scale, frame_record=None, plan=None):
+        """Tile pool task: detect candidates in one tile, in tile coordinates"""
+        x1, y1, x2, y2 = tile
+        tile_frame = frame[y1:y2, x1:x2]
+        context = self._thread_preprocessor().prepare(tile_frame, scale)
+        if frame_record is None:
+            return self._detect_candidates(tile_frame, context, plan)
+        with self.profiler.bind_frame(frame_record):
+            return self._detect_candidates(tile_frame, context, plan)
+    
+    def _thread_preprocessor(self):
+        """Preprocessing buffers must not be shared between threads"""
+        if threading.get_ident() == self._owner_thread:
+            return self.preprocessor
+        preprocessor = getattr(self._local, 'preprocessor', None)
+        if preprocessor is None:
+            preprocessor = self._local.preprocessor = FramePreprocessor()
+        return preprocessor
+    
+    @property
+    def cascade_path(self):
+        return models.get(self.cascade_model)['path']
+    
+    @property
+    def plate_cascade(self):
+        return self._thread_cascade()
+    
+    def _thread_cascade(self):
+        """CascadeClassifier is not safe to share between threads, the registry keeps one per thread"""
+        return models.cascade(self.cascade_model)
+    
+    def close(self):
+        """Shut down the tile thread pool"""
+        with self._tile_pool_lock:
+            tile_pool, self._tile_pool = self._tile_pool, None
+        if tile_pool is not None:
+            tile_pool.shutdown(wait=True)
+    
+    def _refine_box(self, frame, bbox):
+        """
+        Re-fit a box found on the downscaled copy using a padded full resolution crop.
+        Returns the tightest plate-shaped contour box matching the original, or the box unchanged.
+        """
+        x1, y1, x2, y2 = (int(v) for v in bbox)
+        height, width = frame.shape[:2]
+        pad = int(round(2 / self.detection_scale)) + (y2 - y1) // 4
+        rx1, ry1 = max(0, x1 - pad), max(0, y1 - pad)
+        rx2, ry2 = min(width, x2 + pad), min(height, y2 + pad)
+        roi = frame[ry1:ry2, rx1:rx2]
+        if roi.size == 0:
+            return bbox
         
-        # Method 2: Contour-based detection
-        contour_results = self._detect_with_contours(frame)
-        results.extend(contour_results)
+        contours, _ = cv2.findContours(FrameContext(roi).closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
-        # Method 3: Edge-based detection
-        edge_results = self._detect_with_edges(frame)
-        results.extend(edge_results)
+        target = [x1 - rx1, y1 - ry1, x2 - rx1, y2 - ry1]
+        best, best_overlap = bbox, 0.5
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            if h == 0 or not (2.0 < w / h < 5.0 and w > 80 and h > 20):
+                continue
+            overlap = box_overlaps([[x, y, x + w, y + h]], [target], 'iou')[0, 0]
+            if overlap > best_overlap:
+                best = [x + rx1, y + ry1, x + w + rx1, y + h + ry1]
+                best_overlap = overlap
+        return best
+    
+    def _detect_candidates(self, frame, context=None, plan=None):
+        """
+        Run the detection methods on a frame (or region) and return the raw candidates.
+        Without a plan all methods run in the default order.
+        """
+        if context is None:
+            context = FrameContext(frame)
         
-        # Remove duplicate detections
-        results = self._remove_duplicates(results)
+        # Method name (as in result['method']) -> (detection method, profiler stage)
+        # 1. Haar cascade, 2. contour analysis, 3. edge detection with rectangle finding
+        methods = {
+            'cascade': (self._detect_with_cascade, 'cascade'),
+            'contour': (self._detect_with_contours, 'contours'),
+            'edge': (self._detect_with_edges, 'edges'),
+        }
         
-        # Extract text from detected regions
-        for result in results:
-            x1, y1, x2, y2 = result['bbox']
-            crop_img = frame[y1:y2, x1:x2]
-            if crop_img.size > 0:
-                result['text'] = self.extract_text(crop_img)
+        results = []
+        for name in (plan.methods if plan is not None else methods):
+            if plan is not None and not plan.admit(name):
+                continue
+            detect, stage = methods[name]
+            
+            started = time.perf_counter()
+            with self._stage(stage):
+                method_results = detect(frame, context)
+            if plan is not None:
+                plan.record_cost(name, (time.perf_counter() - started) * 1000)
+            
+            self._count(name, len(method_results))
+            results.extend(method_results)
         
         return results
     
-    def _detect_with_cascade(self, frame):
+    def _stage(self, name):
+        """Time a stage when profiling is enabled"""
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.stage(name)
+    
+    def _count(self, name, count):
+        if self.profiler is not None:
+            self.profiler.record_count(name, count)
+    
+    def _detect_with_cascade(self, frame, context=None):
         """Detect plates using Haar cascade classifier"""
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        plates = self.plate_cascade.detectMultiScale(gray, 1.1, 4)
+        if context is None:
+            context = FrameContext(frame)
+        plates = self._thread_cascade().detectMultiScale(context.gray, 1.1, 4)
+        
+        # Size thresholds follow the detection scale
+        scale = context.scale
         
         results = []
         for (x, y, w, h) in plates:
             # Filter by aspect ratio (typical license plate ratio)
             aspect_ratio = w / h
-            if 2.0 < aspect_ratio < 5.0 and w > 80 and h > 20:
-                confidence = random.uniform(0.7, 0.95)  # Simulated confidence
+            if 2.0 < aspect_ratio < 5.0 and w > 80 * scale and h > 20 * scale:
+                confidence = self.rng.uniform(0.7, 0.95)  # Simulated confidence
                 results.append({
                     'bbox': [x, y, x + w, y + h],
                     'confidence': confidence,
@@ -69,34 +383,33 @@ class NumberPlateDetector:
         
         return results
     
-    def _detect_with_contours(self, frame):
+    def _detect_with_contours(self, frame, context=None):
         """Detect plates using contour analysis"""
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        # Apply bilateral filter to reduce noise
-        filtered = cv2.bilateralFilter(gray, 11, 17, 17)
+        if context is None:
+            context = FrameContext(frame)
         
-        # Find edges
-        edged = cv2.Canny(filtered, 30, 200)
-        
-        # Apply morphological operations
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
-        morph = cv2.morphologyEx(edged, cv2.MORPH_CLOSE, kernel)
+        # Bilateral filter, Canny edges and morphological closing come from the context
+        morph = context.closed
         
         # Find contours
         contours, _ = cv2.findContours(morph, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
+        # Size thresholds follow the detection scale
+        scale = context.scale
+        min_area = self.min_area * scale * scale
+        max_area = self.max_area * scale * scale
+        
         results = []
         for contour in contours:
             area = cv2.contourArea(contour)
-            if self.min_area < area < self.max_area:
+            if min_area < area < max_area:
                 # Get bounding rectangle
                 x, y, w, h = cv2.boundingRect(contour)
                 aspect_ratio = w / h
                 
                 # Check if it looks like a license plate
-                if 2.0 < aspect_ratio < 5.0 and w > 80 and h > 20:
-                    confidence = random.uniform(0.6, 0.85)  # Simulated confidence
+                if 2.0 < aspect_ratio < 5.0 and w > 80 * scale and h > 20 * scale:
+                    confidence = self.rng.uniform(0.6, 0.85)  # Simulated confidence
                     results.append({
                         'bbox': [x, y, x + w, y + h],
                         'confidence': confidence,
@@ -105,20 +418,22 @@ class NumberPlateDetector:
         
         return results
     
-    def _detect_with_edges(self, frame):
+    def _detect_with_edges(self, frame, context=None):
         """Detect plates using edge detection and rectangle finding"""
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        # Apply Gaussian blur
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        if context is None:
+            context = FrameContext(frame)
         
-        # Apply adaptive threshold
-        thresh = cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                     cv2.THRESH_BINARY_INV, 11, 2)
+        # Gaussian blur followed by adaptive threshold
+        thresh = context.thresh
         
         # Find contours
         contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
+        # Size thresholds follow the detection scale
+        scale = context.scale
+        min_area = self.min_area * scale * scale
+        max_area = self.max_area * scale * scale
+        
         results = []
         for contour in contours:
             # Approximate contour to polygon
@@ -132,10 +447,10 @@ class NumberPlateDetector:
                 area = cv2.contourArea(contour)
                 
                 if (2.0 < aspect_ratio < 5.0 and 
-                    self.min_area < area < self.max_area and 
-                    w > 80 and h > 20):
+                    min_area < area < max_area and 
+                    w > 80 * scale and h > 20 * scale):
                     
-                    confidence = random.uniform(0.65, 0.90)  # Simulated confidence
+                    confidence = self.rng.uniform(0.65, 0.90)  # Simulated confidence
                     results.append({
                         'bbox': [x, y, x + w, y + h],
                         'confidence': confidence,
@@ -149,34 +464,15 @@ class NumberPlateDetector:
         if not results:
             return results
         
-        # Sort by confidence
-        results.sort(key=lambda x: x['confidence'], reverse=True)
+        boxes = np.array([result['bbox'] for result in results], dtype=np.float64)
+        scores = np.array([result['confidence'] for result in results], dtype=np.float64)
         
-        filtered_results = []
-        for result in results:
-            is_duplicate = False
-            x1, y1, x2, y2 = result['bbox']
-            
-            for existing in filtered_results:
-                ex1, ey1, ex2, ey2 = existing['bbox']
-                
-                # Calculate overlap
-                overlap_x = max(0, min(x2, ex2) - max(x1, ex1))
-                overlap_y = max(0, min(y2, ey2) - max(y1, ey1))
-                overlap_area = overlap_x * overlap_y
-                
-                area1 = (x2 - x1) * (y2 - y1)
-                area2 = (ex2 - ex1) * (ey2 - ey1)
-                
-                # If overlap is more than 50%, consider it duplicate
-                if overlap_area > 0.5 * min(area1, area2):
-                    is_duplicate = True
-                    break
-            
-            if not is_duplicate:
-                filtered_results.append(result)
+        weights = None
+        if self.method_weights:
+            weights = [self.method_weights.get(result['method'], 1.0) for result in results]
         
-        return filtered_results
+        keep = non_max_suppression(boxes, scores, self.nms_threshold, self.nms_metric, weights)
+        return [results[i] for i in keep]
     
     def extract_text(self, image):
         """Extract text from license plate image using OCR simulation"""
@@ -184,39 +480,126 @@ class NumberPlateDetector:
             return ""
         
         try:
-            # Convert to grayscale
-            if len(image.shape) == 3:
-                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            else:
-                gray = image
-            
-            # Apply image processing for better OCR
-            # Resize image for better recognition
-            height, width = gray.shape
-            if height < 50:
-                scale_factor = 50 / height
-                new_width = int(width * scale_factor)
-                gray = cv2.resize(gray, (new_width, 50))
+            thresh = self._normalize_crop(image)
             
-            # Apply threshold
-            _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            # Near-identical crops (parked or stopped vehicles) hash to the same key
+            key = None
+            if self.ocr_cache is not None:
+                key = crop_key(thresh)
+                cached = self.ocr_cache.get(key)
+                if cached is not None:
+                    return cached
             
-            # Simulate OCR result (in real implementation, use pytesseract here)
-            # For demo purposes, generate realistic Indian license plate numbers
-            sample_plates = [
-                "MH09AB1234", "DL01BC5678", "KA05MN9012", "TN07PQ3456",
-                "GJ02RS7890", "RJ14UV2345", "UP16XY6789", "WB19CD0123",
-                "MP04EF4567", "HR26GH8901", "PB03IJ2345", "AP28KL6789",
-                "TS09MN0123", "KL08OP4567", "OR21QR8901", "JH20ST2345"
-            ]
+            text = self._recognize(thresh)
             
-            # Return a random plate number (in real implementation, this would be OCR result)
-            if random.random() > 0.3:  # 70% success rate simulation
-                return random.choice(sample_plates)
-            else:
-                return ""  # Simulate OCR failure
+            # Failed reads are not cached so the next crop gets another try
+            if key is not None and text:
+                self.ocr_cache.put(key, text)
+            return text
                 
         except Exception as e:
             print(f"Error in text extraction: {e}")
             return ""
+    
+    def extract_text_batch(self, crops):
+        """
+        Extract text from several plate crops at once: they are normalized into
+        one contiguous batch and recognized in a single _recognize_batch call
+        """
+        texts = [""] * len(crops)
+        indices = [i for i, crop in enumerate(crops) if crop.size > 0]
+        if not indices:
+            return texts
+        
+        try:
+            batch, widths = normalize_batch([crops[i] for i in indices])
+            
+            # Cache hits are answered directly, only misses reach the recognizer
+            keys = [None] * len(indices)
+            misses = list(range(len(indices)))
+            if self.ocr_cache is not None:
+                misses = []
+                for j in range(len(indices)):
+                    keys[j] = crop_key(batch[j, :, :widths[j]])
+                    cached = self.ocr_cache.get(keys[j])
+                    if cached is not None:
+                        texts[indices[j]] = cached
+                    else:
+                        misses.append(j)
+            
+            if misses:
+                recognized = self._recognize_batch(batch[misses], widths[misses])
+                for j, text in zip(misses, recognized):
+                    texts[indices[j]] = text
+                    if keys[j] is not None and text:
+                        self.ocr_cache.put(keys[j], text)
+            return texts
+        
+        except Exception as e:
+            print(f"Error in batch text extraction: {e}")
+            return texts
+    
+    def _read_texts(self, crops):
+        """extract_text_batch, through the ocr_batcher when one is set"""
+        if self.ocr_batcher is None or not crops:
+            return self.extract_text_batch(crops)
+        futures = [self.ocr_batcher.submit(crop) for crop in crops]
+        return [future.result() for future in futures]
+    
+    def _recognize_batch(self, batch, widths):
+        """
+        Recognize an (N, H, W) batch of normalized crops, row i being valid up to widths[i].
+        A real OCR backend should override this to run the whole batch in one call.
+        """
+        return [self._recognize(batch[i, :, :widths[i]]) for i in range(len(batch))]
+    
+    def _normalize_crop(self, image):
+        """Grayscale, upscale to at least 50 px high and Otsu threshold a plate crop"""
+        # Convert to grayscale
+        if len(image.shape) == 3:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        else:
+            gray = image
+        
+        # Apply image processing for better OCR
+        # Resize image for better recognition
+        height, width = gray.shape
+        if height < 50:
+            scale_factor = 50 / height
+            new_width = int(width * scale_factor)
+            gray = cv2.resize(gray, (new_width, 50))
+        
+        # Apply threshold
+        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return thresh
+    
+    def _recognize(self, thresh):
+        """Recognize the text of a normalized plate crop"""
+        # Simulate OCR result (in real implementation, use pytesseract here)
+        # For demo purposes, generate realistic Indian license plate numbers
+        sample_plates = [
+            "MH09AB1234", "DL01BC5678", "KA05MN9012", "TN07PQ3456",
+            "GJ02RS7890", "RJ14UV2345", "UP16XY6789", "WB19CD0123",
+            "MP04EF4567", "HR26GH8901", "PB03IJ2345", "AP28KL6789",
+            "TS09MN0123", "KL08OP4567", "OR21QR8901", "JH20ST2345"
+        ]
+        
+        # Return a random plate number (in real implementation, this would be OCR result)
+        if self.rng.random() > 0.3:  # 70% success rate simulation
+            return self.rng.choice(sample_plates)
+        else:
+            return ""  # Simulate OCR failure
+
 
+def create_detector(detection_scale=1.0, worker=False):
+    """
+    Detector with an OCR cache, as the command line tools, pipelines and services use it.
+    worker=True is for pool workers: parallelism comes from the pool, so OpenCV
+    is kept single threaded in the worker.
+    """
+    if worker:
+        cv2.setNumThreads(1)
+    detector = NumberPlateDetector()
+    detector.detection_scale = detection_scale
+    detector.ocr_cache = OcrCache()
+    return detector
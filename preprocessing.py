@@ -0,0 +1,104 @@
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+class FramePreprocessor:
+    """Builds per-frame contexts and keeps their buffers alive between frames"""
+
+    def __init__(self, max_shapes=4):
+        # Buffers are kept for the most recently used resolutions (e.g. full and edge tiles)
+        self.max_shapes = max_shapes
+        self._buffers_by_shape = OrderedDict()
+
+    def prepare(self, frame, scale=1.0):
+        """
+        Return a FrameContext for the given frame.
+        Buffers are reused while consecutive frames have the same resolution,
+        so a context is only valid until the next call to prepare().
+        scale is the frame's size relative to the original (for downscaled detection).
+        """
+        shape = frame.shape[:2]
+        buffers = self._buffers_by_shape.get(shape)
+        if buffers is None:
+            buffers = {}
+            self._buffers_by_shape[shape] = buffers
+            while len(self._buffers_by_shape) > self.max_shapes:
+                self._buffers_by_shape.popitem(last=False)
+        else:
+            self._buffers_by_shape.move_to_end(shape)
+        return FrameContext(frame, buffers, scale)
+
+
+class FrameContext:
+    """Lazily computed and memoized intermediates shared by the detection methods"""
+
+    def __init__(self, frame, buffers=None, scale=1.0):
+        self.frame = frame
+        # Size of this frame relative to the original, size thresholds scale with it
+        self.scale = scale
+        self._buffers = buffers if buffers is not None else {}
+        self._cache = {}
+
+    def _buffer(self, name):
+        # Single channel 8-bit buffer with the frame's resolution
+        buffer = self._buffers.get(name)
+        if buffer is None:
+            buffer = np.empty(self.frame.shape[:2], dtype=np.uint8)
+            self._buffers[name] = buffer
+        return buffer
+
+    @property
+    def gray(self):
+        """Grayscale version of the frame"""
+        if 'gray' not in self._cache:
+            if len(self.frame.shape) == 2:
+                self._cache['gray'] = self.frame
+            else:
+                self._cache['gray'] = cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY,
+                                                   dst=self._buffer('gray'))
+        return self._cache['gray']
+
+    @property
+    def filtered(self):
+        """Bilateral filtered grayscale (noise reduced, edges preserved)"""
+        if 'filtered' not in self._cache:
+            self._cache['filtered'] = cv2.bilateralFilter(self.gray, 11, 17, 17,
+                                                          dst=self._buffer('filtered'))
+        return self._cache['filtered']
+
+    @property
+    def edged(self):
+        """Canny edge map of the filtered grayscale"""
+        if 'edged' not in self._cache:
+            self._cache['edged'] = cv2.Canny(self.filtered, 30, 200,
+                                             edges=self._buffer('edged'))
+        return self._cache['edged']
+
+    @property
+    def closed(self):
+        """Edge map after morphological closing"""
+        if 'closed' not in self._cache:
+            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+            self._cache['closed'] = cv2.morphologyEx(self.edged, cv2.MORPH_CLOSE, kernel,
+                                                     dst=self._buffer('closed'))
+        return self._cache['closed']
+
+    @property
+    def blurred(self):
+        """Gaussian blurred grayscale"""
+        if 'blurred' not in self._cache:
+            self._cache['blurred'] = cv2.GaussianBlur(self.gray, (5, 5), 0,
+                                                      dst=self._buffer('blurred'))
+        return self._cache['blurred']
+
+    @property
+    def thresh(self):
+        """Inverted adaptive threshold of the blurred grayscale"""
+        if 'thresh' not in self._cache:
+            self._cache['thresh'] = cv2.adaptiveThreshold(self.blurred, 255,
+                                                          cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                                          cv2.THRESH_BINARY_INV, 11, 2,
+                                                          dst=self._buffer('thresh'))
+        return self._cache['thresh']
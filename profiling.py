@@ -0,0 +1,166 @@
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class RollingHistogram:
+    """Keeps the most recent samples and reports percentiles over them"""
+
+    def __init__(self, window=1000):
+        self._samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value):
+        self._samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def summary(self, percentiles=(50, 95, 99)):
+        """Count, mean, max and percentiles of the samples in the window"""
+        if not self._samples:
+            return {'count': self.count}
+        samples = np.fromiter(self._samples, dtype=np.float64, count=len(self._samples))
+        summary = {
+            'count': self.count,
+            'mean': float(samples.mean()),
+            'max': float(samples.max())
+        }
+        for p, value in zip(percentiles, np.percentile(samples, percentiles)):
+            summary[f'p{p}'] = float(value)
+        return summary
+
+
+class DetectorProfiler:
+    """
+    Records wall time per detection stage and candidate counts per method.
+
+    Stages and counts reported inside begin_frame()/end_frame() are summed per
+    frame, so a stage that runs several times (e.g. once per motion region or
+    tile) is counted once with its total. Hooks are called with each finished frame record.
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.timings = defaultdict(lambda: RollingHistogram(self.window))
+        self.counts = defaultdict(lambda: RollingHistogram(self.window))
+        self.frames = 0
+        self._frame_times = deque(maxlen=window)
+        self._hooks = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def add_hook(self, callback):
+        """Register callback(record) called after every frame"""
+        self._hooks.append(callback)
+
+    def remove_hook(self, callback):
+        self._hooks.remove(callback)
+
+    def begin_frame(self):
+        self._local.frame = {'timings': defaultdict(float), 'counts': defaultdict(int),
+                             'started': time.perf_counter()}
+
+    def current_frame(self):
+        """The frame record open on this thread, to hand to helper threads via bind_frame()"""
+        return getattr(self._local, 'frame', None)
+
+    @contextmanager
+    def bind_frame(self, frame):
+        """Attribute stages timed on this (helper) thread to another thread's open frame"""
+        previous = getattr(self._local, 'frame', None)
+        self._local.frame = frame
+        try:
+            yield
+        finally:
+            self._local.frame = previous
+
+    def end_frame(self):
+        """Close the current frame, update the histograms and run the hooks"""
+        frame = getattr(self._local, 'frame', None)
+        if frame is None:
+            return None
+        self._local.frame = None
+        finished = time.perf_counter()
+
+        record = {
+            'timestamp': time.time(),
+            'total_ms': (finished - frame['started']) * 1000,
+            'stages_ms': {stage: seconds * 1000 for stage, seconds in frame['timings'].items()},
+            'counts': dict(frame['counts'])
+        }
+
+        with self._lock:
+            self.frames += 1
+            self._frame_times.append(finished)
+            self.timings['frame'].add(record['total_ms'])
+            for stage, ms in record['stages_ms'].items():
+                self.timings[stage].add(ms)
+            for name, count in record['counts'].items():
+                self.counts[name].add(count)
+
+        for hook in list(self._hooks):
+            hook(record)
+        return record
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as the given stage"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_time(name, time.perf_counter() - started)
+
+    def record_time(self, stage, seconds):
+        frame = getattr(self._local, 'frame', None)
+        if frame is not None:
+            with self._lock:
+                frame['timings'][stage] += seconds
+        else:
+            with self._lock:
+                self.timings[stage].add(seconds * 1000)
+
+    def record_count(self, name, count):
+        frame = getattr(self._local, 'frame', None)
+        if frame is not None:
+            with self._lock:
+                frame['counts'][name] += count
+        else:
+            with self._lock:
+                self.counts[name].add(count)
+
+    @property
+    def fps(self):
+        """Frames per second over the recent window"""
+        with self._lock:
+            if len(self._frame_times) < 2:
+                return 0.0
+            elapsed = self._frame_times[-1] - self._frame_times[0]
+            return (len(self._frame_times) - 1) / elapsed if elapsed > 0 else 0.0
+
+    def snapshot(self):
+        """All statistics as a plain dict (times in milliseconds)"""
+        with self._lock:
+            timings = {stage: histogram.summary() for stage, histogram in self.timings.items()}
+            counts = {name: histogram.summary() for name, histogram in self.counts.items()}
+            frames = self.frames
+        return {'frames': frames, 'fps': self.fps, 'timings_ms': timings, 'counts': counts}
+
+    def to_json(self, indent=2):
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            f.write(self.to_json())
+
+    def reset(self):
+        with self._lock:
+            self.timings.clear()
+            self.counts.clear()
+            self.frames = 0
+            self._frame_times.clear()
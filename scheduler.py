@@ -0,0 +1,159 @@
+import statistics
+import threading
+import time
+
+DETECTION_METHODS = ('cascade', 'contour', 'edge')
+
+
+class FramePlan:
+    """Which methods may run on the current frame, and what they cost so far"""
+
+    def __init__(self, scheduler, methods):
+        self.scheduler = scheduler
+        self.methods = methods
+        self.started = time.perf_counter()
+        self.costs_ms = {}
+        self._decisions = {}
+        self._lock = threading.Lock()
+
+    @property
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def admit(self, method):
+        """
+        Decide once per frame whether a method runs, so every region or tile of
+        the frame makes the same choice
+        """
+        with self._lock:
+            if method not in self._decisions:
+                self._decisions[method] = self.scheduler._admit(self, method)
+            return self._decisions[method]
+
+    def record_cost(self, method, ms):
+        with self._lock:
+            self.costs_ms[method] = self.costs_ms.get(method, 0.0) + ms
+
+    @property
+    def ran(self):
+        return [method for method, admitted in self._decisions.items() if admitted]
+
+
+class MethodScheduler:
+    """
+    Adaptive scheduling of the detection methods under a per-frame latency budget.
+
+    Keeps a moving average of each method's cost and of its share of the
+    detections that survive dedup. Methods are tried in order of contribution
+    per millisecond; until a method's contribution is known it is ranked by
+    cost alone. Until a method has run warmup_runs times it counts as
+    unmeasured and runs while the frame still has budget left; its cost then
+    starts from the median of those runs, so a cold first call (cascade load,
+    allocations) does not get it skipped. After that, a method whose predicted
+    cost does not fit in what remains of budget_ms is skipped, the first method
+    included; only when no method fits at all does the cheapest one run alone.
+    A method that rarely contributes or was skipped for the budget is run again
+    every probe_interval frames, so its estimates follow the scene.
+    Keep one scheduler per camera, the statistics are scene dependent.
+    """
+
+    def __init__(self, budget_ms=None, probe_interval=30, min_contribution=0.05, smoothing=0.2,
+                 warmup_runs=3, methods=DETECTION_METHODS):
+        # Per-frame deadline for the detection methods (None for no deadline)
+        self.budget_ms = budget_ms
+        # Frames between re-probes of a skipped method
+        self.probe_interval = probe_interval
+        # Methods with a smaller share of the final detections are sub-sampled
+        self.min_contribution = min_contribution
+        # Weight of the newest frame in the moving averages
+        self.smoothing = smoothing
+        # Runs whose median seeds a method's cost estimate
+        self.warmup_runs = max(1, warmup_runs)
+
+        self.methods = tuple(methods)
+        self.cost_ms = {method: None for method in self.methods}
+        self._warmup_ms = {method: [] for method in self.methods}
+        self.contribution = {method: None for method in self.methods}
+        self.last_run = {method: None for method in self.methods}
+        self.skipped = {method: 0 for method in self.methods}
+        self.frame_index = -1
+
+    def begin_frame(self):
+        """Plan the next frame: methods ordered from most to least useful per millisecond"""
+        self.frame_index += 1
+        return FramePlan(self, sorted(self.methods, key=self._priority))
+
+    def end_frame(self, plan, results):
+        """Update costs and contributions from the methods that ran and the final detections"""
+        ran = plan.ran
+        total = len(results)
+        for method in ran:
+            self.last_run[method] = self.frame_index
+            self._record_cost(method, plan.costs_ms.get(method, 0.0))
+            if total:
+                share = sum(1 for result in results if result['method'] == method) / total
+                self.contribution[method] = self._average(self.contribution[method], share)
+        for method in self.methods:
+            if method not in ran:
+                self.skipped[method] += 1
+
+    def stats(self):
+        return {
+            'frame': self.frame_index,
+            'budget_ms': self.budget_ms,
+            'cost_ms': dict(self.cost_ms),
+            'contribution': dict(self.contribution),
+            'skipped': dict(self.skipped)
+        }
+
+    def _record_cost(self, method, ms):
+        samples = self._warmup_ms[method]
+        if len(samples) < self.warmup_runs:
+            samples.append(ms)
+            if len(samples) == self.warmup_runs:
+                self.cost_ms[method] = statistics.median(samples)
+            return
+        self.cost_ms[method] = self._average(self.cost_ms[method], ms)
+
+    def _average(self, current, sample):
+        if current is None:
+            return sample
+        return current + self.smoothing * (sample - current)
+
+    def _priority(self, method):
+        cost = self.cost_ms[method]
+        if cost is None:
+            # Not measured yet (still warming up): run first while the frame is still empty
+            return (0, 0.0)
+        # Until a method has seen a frame with detections, assume an even share of them,
+        # so unknown methods are ranked by their measured cost
+        contribution = self.contribution[method]
+        if contribution is None:
+            contribution = 1.0 / len(self.methods)
+        return (1, -contribution / max(cost, 0.01))
+
+    def _due_for_probe(self, method):
+        last = self.last_run[method]
+        return last is None or self.frame_index - last >= self.probe_interval
+
+    def _admit(self, plan, method):
+        cost = self.cost_ms[method]
+        if cost is None:
+            # Unmeasured methods are probed while there is budget left, the first one of the
+            # frame always runs so that nothing stays unmeasured
+            return not plan.ran or self.budget_ms is None or plan.elapsed_ms < self.budget_ms
+
+        contribution = self.contribution[method]
+        if contribution is not None and contribution < self.min_contribution and not self._due_for_probe(method):
+            return False
+
+        # The budget applies to every measured method, the first one included. A skipped
+        # method is still re-measured every probe_interval frames, its cost may have dropped.
+        if self.budget_ms is not None and plan.elapsed_ms + cost > self.budget_ms:
+            return self._due_for_probe(method) or (not plan.ran and self._fallback(method))
+        return True
+
+    def _fallback(self, method):
+        """When no measured method fits the budget at all, the cheapest one still runs"""
+        costs = [cost for cost in self.cost_ms.values() if cost is not None]
+        return min(costs) > self.budget_ms and self.cost_ms[method] == min(costs)
@@ -0,0 +1,489 @@
+"""
+Local detection service: HTTP over TCP or a Unix socket, with micro-batching.
+
+Usage:
+    python -m service --port 8080 --workers 4
+    python -m service --unix /tmp/plates.sock --max-batch 8 --max-wait-ms 5
+
+Endpoints:
+    POST /detect   An encoded image (JPEG, PNG, ...) as the body, or a raw
+                   uint8 BGR/gray frame with Content-Type application/octet-stream
+                   and an X-Frame-Shape: HEIGHTxWIDTH[xCHANNELS] header.
+                   Answers {"detections": [...], "latency_ms": ...} as soon as
+                   the request's batch is done.
+    GET /metrics   Queue depths, batch sizes, latency percentiles and counters
+    GET /health
+
+Connections are kept alive, so clients should reuse them for high request rates.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlsplit
+
+import cv2
+import numpy as np
+
+from plate_detector import create_detector
+from profiling import RollingHistogram
+from state_mapper import StateMapper
+
+MAX_HEADER_BYTES = 16 * 1024
+
+# One detector per worker (process, or the service process with --threads), created by _init_worker
+_detector = None
+
+
+def _init_worker(detection_scale=1.0):
+    global _detector
+    _detector = create_detector(detection_scale, worker=True)
+
+
+def detect_batch(frames):
+    """Worker task: detect plates in a batch of frames, one result list per frame"""
+    return _detector.detect_plates_batch(frames)
+
+
+def decode_frame(body, content_type=None, shape=None):
+    """
+    Frame from a request body: raw pixels when a shape ('HxW' or 'HxWxC') is
+    given or the content type is application/octet-stream, otherwise an encoded image
+    """
+    if content_type == 'application/octet-stream' or shape:
+        if not shape:
+            raise ValueError("Raw frames need an X-Frame-Shape header")
+        try:
+            dims = tuple(int(v) for v in shape.lower().split('x'))
+        except ValueError:
+            raise ValueError(f"Invalid frame shape: {shape}")
+        if len(dims) not in (2, 3) or min(dims) < 1 or (len(dims) == 3 and dims[2] not in (1, 3)):
+            raise ValueError(f"Invalid frame shape: {shape}")
+        if np.prod(dims) != len(body):
+            raise ValueError(f"Body has {len(body)} bytes, shape {shape} needs {int(np.prod(dims))}")
+        frame = np.frombuffer(body, dtype=np.uint8).reshape(dims)
+        if frame.ndim == 3 and frame.shape[2] == 1:
+            frame = frame[:, :, 0]
+        # Grayscale frames are expanded, the detector expects BGR
+        return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR) if frame.ndim == 2 else frame
+
+    frame = cv2.imdecode(np.frombuffer(body, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ValueError("Body is not a decodable image")
+    return frame
+
+
+class Overloaded(Exception):
+    """Raised by MicroBatcher.submit() when max_pending frames are already waiting or running"""
+
+
+class MicroBatcher:
+    """
+    Groups frames submitted by concurrent requests into batches for a worker pool.
+
+    A batch is dispatched once it has max_batch frames, or once its oldest
+    frame has waited max_wait_ms, whichever comes first. At most concurrency
+    batches run at once; while every worker is busy, frames keep queueing and
+    the next batch is correspondingly larger. Must be used from one event loop.
+    """
+
+    def __init__(self, executor, run_batch=detect_batch, max_batch=8, max_wait_ms=5.0,
+                 max_pending=64, concurrency=1):
+        if max_batch < 1 or concurrency < 1 or max_pending < 1:
+            raise ValueError("max_batch, concurrency and max_pending must be at least 1")
+        self.executor = executor
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_pending = max_pending
+        self.concurrency = concurrency
+
+        self.batches = 0
+        self.frames = 0
+        self.rejected = 0
+        self.failed_batches = 0
+        self.in_flight = 0
+        self.batch_sizes = RollingHistogram()
+        self.batch_ms = RollingHistogram()
+
+        # (frame, future, enqueued at) waiting for a batch
+        self._queue = []
+        self._arrived = None
+        self._slots = None
+        self._task = None
+        # The event loop only keeps weak references to tasks
+        self._dispatching = set()
+
+    @property
+    def queue_depth(self):
+        return len(self._queue)
+
+    @property
+    def pending(self):
+        """Frames queued or being processed"""
+        return len(self._queue) + self.in_flight
+
+    def start(self):
+        self._arrived = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for _, future, _ in self._queue:
+            if not future.done():
+                future.cancel()
+        self._queue.clear()
+
+    def submit(self, frame):
+        """Queue a frame, returns a future for its detections. Raises Overloaded when full."""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise Overloaded()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((frame, future, time.monotonic()))
+        self._arrived.set()
+        return future
+
+    async def _run(self):
+        while True:
+            # Take a worker slot first, so frames accumulate while every worker is busy
+            await self._slots.acquire()
+            try:
+                while not self._queue:
+                    self._arrived.clear()
+                    await self._arrived.wait()
+                # Give other requests until the oldest frame's deadline to join the batch
+                while len(self._queue) < self.max_batch:
+                    remaining = self._queue[0][2] + self.max_wait - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._arrived.clear()
+                    try:
+                        await asyncio.wait_for(self._arrived.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+            except BaseException:
+                self._slots.release()
+                raise
+
+            batch = self._queue[:self.max_batch]
+            del self._queue[:self.max_batch]
+            self.in_flight += len(batch)
+            task = asyncio.create_task(self._dispatch(batch))
+            self._dispatching.add(task)
+            task.add_done_callback(self._dispatching.discard)
+
+    async def _dispatch(self, batch):
+        started = time.perf_counter()
+        try:
+            # Requests that gave up while queued are left out
+            live = [item for item in batch if not item[1].done()]
+            if not live:
+                return
+            try:
+                results = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, self.run_batch, [frame for frame, _, _ in live])
+            except Exception as e:
+                self.failed_batches += 1
+                for _, future, _ in live:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            self.batches += 1
+            self.frames += len(live)
+            self.batch_sizes.add(len(live))
+            self.batch_ms.add((time.perf_counter() - started) * 1000)
+            for (_, future, _), detections in zip(live, results):
+                if not future.done():
+                    future.set_result(detections)
+        finally:
+            self.in_flight -= len(batch)
+            self._slots.release()
+
+    def stats(self):
+        return {
+            'queue_depth': self.queue_depth,
+            'in_flight': self.in_flight,
+            'max_pending': self.max_pending,
+            'batches': self.batches,
+            'frames': self.frames,
+            'rejected': self.rejected,
+            'failed_batches': self.failed_batches,
+            'batch_size': self.batch_sizes.summary(),
+            'batch_ms': self.batch_ms.summary()
+        }
+
+
+class BadRequest(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class DetectionService:
+    """
+    Minimal HTTP/1.1 front end for a MicroBatcher.
+
+    Bodies are decoded on decode_executor, off the event loop. Detections are
+    enriched with the StateMapper's state and district. Requests beyond the
+    batcher's max_pending are answered 503 right away instead of queueing.
+    """
+
+    def __init__(self, batcher, state_mapper=None, decode_executor=None, max_body=32 * 1024 * 1024,
+                 request_timeout=10.0):
+        self.batcher = batcher
+        self.state_mapper = state_mapper or StateMapper()
+        self.decode_executor = decode_executor
+        self.max_body = max_body
+        self.request_timeout = request_timeout
+        self.requests = 0
+        self.connections = 0
+        self.responses = {}
+        self.latency_ms = RollingHistogram()
+        self._started_at = time.monotonic()
+
+    async def handle_connection(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+                                        {'error': 'headers too large'}, keep_alive=False)
+                    return
+
+                try:
+                    method, path, version, headers = self._parse_head(head)
+                except BadRequest as e:
+                    await self._respond(writer, e.status, {'error': str(e)}, keep_alive=False)
+                    return
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and version != 'HTTP/1.0')
+
+                try:
+                    length = int(headers.get('content-length', 0))
+                except ValueError:
+                    length = -1
+                if length < 0 or length > self.max_body:
+                    status = HTTPStatus.BAD_REQUEST if length < 0 else HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+                    await self._respond(writer, status, {'error': 'invalid or too large body'},
+                                        keep_alive=False)
+                    return
+                try:
+                    body = await reader.readexactly(length) if length else b''
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+
+                self.requests += 1
+                status, payload, extra = await self._route(method, path, headers, body)
+                await self._respond(writer, status, payload, keep_alive, extra)
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _parse_head(self, head):
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ')
+        except ValueError:
+            raise BadRequest(HTTPStatus.BAD_REQUEST, "malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, sep, value = line.partition(':')
+                if not sep:
+                    raise BadRequest(HTTPStatus.BAD_REQUEST, "malformed header")
+                headers[name.strip().lower()] = value.strip()
+        return method, urlsplit(target).path, version, headers
+
+    async def _route(self, method, path, headers, body):
+        """(status, JSON payload, extra headers) for one request"""
+        if path == '/detect':
+            if method != 'POST':
+                return HTTPStatus.METHOD_NOT_ALLOWED, {'error': 'use POST'}, {'Allow': 'POST'}
+            return await self._detect(headers, body)
+        if path == '/metrics' and method == 'GET':
+            return HTTPStatus.OK, self.metrics(), None
+        if path == '/health' and method == 'GET':
+            return HTTPStatus.OK, {'status': 'ok'}, None
+        return HTTPStatus.NOT_FOUND, {'error': f'no route for {method} {path}'}, None
+
+    async def _detect(self, headers, body):
+        started = time.perf_counter()
+        # Refuse before spending time on decoding
+        if self.batcher.pending >= self.batcher.max_pending:
+            self.batcher.rejected += 1
+            return HTTPStatus.SERVICE_UNAVAILABLE, {'error': 'overloaded'}, {'Retry-After': '1'}
+
+        loop = asyncio.get_running_loop()
+        content_type = headers.get('content-type', '').split(';')[0].strip().lower()
+        try:
+            frame = await loop.run_in_executor(self.decode_executor, decode_frame, body,
+                                               content_type, headers.get('x-frame-shape'))
+        except ValueError as e:
+            return HTTPStatus.BAD_REQUEST, {'error': str(e)}, None
+
+        try:
+            future = self.batcher.submit(frame)
+        except Overloaded:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {'error': 'overloaded'}, {'Retry-After': '1'}
+        try:
+            detections = await asyncio.wait_for(future, self.request_timeout)
+        except asyncio.TimeoutError:
+            return HTTPStatus.GATEWAY_TIMEOUT, {'error': 'detection timed out'}, None
+        except Exception as e:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f'detection failed: {e}'}, None
+
+        latency_ms = (time.perf_counter() - started) * 1000
+        self.latency_ms.add(latency_ms)
+        return HTTPStatus.OK, {
+            'width': frame.shape[1],
+            'height': frame.shape[0],
+            'detections': [self._record(detection) for detection in detections],
+            'latency_ms': round(latency_ms, 2)
+        }, None
+
+    def _record(self, detection):
+        x1, y1, x2, y2 = (int(v) for v in detection['bbox'])
+        text = detection.get('text', '')
+        info = self.state_mapper.get_location_info(text)
+        return {
+            'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2,
+            'confidence': round(float(detection['confidence']), 4),
+            'method': detection['method'],
+            'text': text,
+            'state': info['state'],
+            'district': info['district']
+        }
+
+    async def _respond(self, writer, status, payload, keep_alive=True, extra_headers=None):
+        status = HTTPStatus(status)
+        self.responses[status.value] = self.responses.get(status.value, 0) + 1
+        body = json.dumps(payload).encode('utf-8')
+        head = [f'HTTP/1.1 {status.value} {status.phrase}',
+                'Content-Type: application/json',
+                f'Content-Length: {len(body)}',
+                'Connection: ' + ('keep-alive' if keep_alive else 'close')]
+        for name, value in (extra_headers or {}).items():
+            head.append(f'{name}: {value}')
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+    def metrics(self):
+        uptime = time.monotonic() - self._started_at
+        return {
+            'uptime_s': round(uptime, 1),
+            'connections': self.connections,
+            'requests': self.requests,
+            'requests_per_s': self.requests / uptime if uptime > 0 else 0.0,
+            'responses': {str(status): count for status, count in sorted(self.responses.items())},
+            'latency_ms': self.latency_ms.summary(),
+            'batcher': self.batcher.stats(),
+            'state_cache': self.state_mapper.cache_info()._asdict()
+        }
+
+
+def create_executor(workers, threads=False, detection_scale=1.0):
+    """Detector worker pool: processes by default, or threads sharing one detector"""
+    if threads:
+        _init_worker(detection_scale)
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='detector')
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    # Spawned workers do not inherit the event loop or the decode threads
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=_init_worker, initargs=(detection_scale,))
+
+
+async def serve(args):
+    executor = create_executor(args.workers, args.threads, args.detection_scale)
+    decode_executor = ThreadPoolExecutor(max_workers=args.decode_threads, thread_name_prefix='decode')
+    batcher = MicroBatcher(executor, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms,
+                           max_pending=args.max_pending, concurrency=args.workers)
+    service = DetectionService(batcher, decode_executor=decode_executor,
+                               max_body=int(args.max_body_mb * 1024 * 1024),
+                               request_timeout=args.timeout)
+    batcher.start()
+
+    if args.unix:
+        if os.path.exists(args.unix):
+            os.unlink(args.unix)
+        server = await asyncio.start_unix_server(service.handle_connection, args.unix,
+                                                 limit=MAX_HEADER_BYTES)
+        address = args.unix
+    else:
+        server = await asyncio.start_server(service.handle_connection, args.host, args.port,
+                                            limit=MAX_HEADER_BYTES)
+        address = f"http://{args.host}:{args.port}"
+    print(f"Serving on {address} with {args.workers} "
+          f"{'thread' if args.threads else 'process'} worker(s)", file=sys.stderr)
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await batcher.stop()
+        executor.shutdown(wait=False, cancel_futures=True)
+        decode_executor.shutdown(wait=False)
+        if _detector is not None:
+            # Thread workers share this process's detector
+            _detector.close()
+        if args.unix and os.path.exists(args.unix):
+            os.unlink(args.unix)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='service', description="Number plate detection service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--unix', help="Listen on this Unix socket path instead of TCP")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help="Number of detector workers")
+    parser.add_argument('--threads', action='store_true',
+                        help="Run the workers as threads of the service process instead of processes")
+    parser.add_argument('--max-batch', type=int, default=8, help="Frames per batch")
+    parser.add_argument('--max-wait-ms', type=float, default=5.0,
+                        help="Longest a frame waits for its batch to fill")
+    parser.add_argument('--max-pending', type=int, default=64,
+                        help="Frames queued or in progress before requests are refused with 503")
+    parser.add_argument('--max-body-mb', type=float, default=32, help="Largest accepted request body")
+    parser.add_argument('--timeout', type=float, default=10.0, help="Per-request detection timeout in seconds")
+    parser.add_argument('--decode-threads', type=int, default=2, help="Threads decoding request bodies")
+    parser.add_argument('--detection-scale', type=float, default=1.0,
+                        help="Search for plates on a copy downscaled by this factor (e.g. 0.5 for 4K)")
+    args = parser.parse_args(argv)
+    if min(args.workers, args.max_batch, args.max_pending, args.decode_threads) < 1:
+        parser.error("--workers, --max-batch, --max-pending and --decode-threads must be at least 1")
+    if not 0 < args.detection_scale <= 1:
+        parser.error("--detection-scale must be in (0, 1]")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
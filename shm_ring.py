@@ -0,0 +1,126 @@
+import multiprocessing
+import queue
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class SharedFrameRing:
+    """
+    Fixed-size frame slots in one shared memory block, for passing video frames
+    between processes without pickling them.
+
+    Producers acquire() a free slot, write the frame into slot(index) in place
+    and publish() it. Consumers consume() the index of a ready slot, read the
+    frame as a NumPy view and release() the slot when done with it. Only slot
+    indices and small metadata go through the queues.
+
+    The ring is created in the parent process and handed to child processes as
+    a Process argument, the children attach to the same block.
+    """
+
+    def __init__(self, shape, dtype=np.uint8, slots=8, ctx=None):
+        if slots < 1:
+            raise ValueError("slots must be at least 1")
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.slots = slots
+        self.slot_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slot_bytes * slots)
+        self._owner = True
+
+        if ctx is None:
+            ctx = multiprocessing.get_context()
+        # Indices of slots nobody holds, and of slots holding a published frame
+        self._free = ctx.Queue()
+        self._ready = ctx.Queue()
+        for index in range(slots):
+            self._free.put(index)
+        self._views = None
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def __getstate__(self):
+        return {
+            'name': self._shm.name, 'shape': self.shape, 'dtype': self.dtype.str,
+            'slots': self.slots, 'free': self._free, 'ready': self._ready
+        }
+
+    def __setstate__(self, state):
+        self.shape = state['shape']
+        self.dtype = np.dtype(state['dtype'])
+        self.slots = state['slots']
+        self.slot_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self._shm = shared_memory.SharedMemory(name=state['name'])
+        self._owner = False
+        self._free = state['free']
+        self._ready = state['ready']
+        self._views = None
+
+    def slot(self, index):
+        """NumPy view of a slot (no copy), valid until the ring is closed"""
+        if self._views is None:
+            self._views = [
+                np.ndarray(self.shape, self.dtype, buffer=self._shm.buf, offset=i * self.slot_bytes)
+                for i in range(self.slots)
+            ]
+        return self._views[index]
+
+    def acquire(self, timeout=None):
+        """Index of a free slot to write into, or None on timeout"""
+        try:
+            return self._free.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def publish(self, index, meta=None):
+        """Hand a written slot to the consumers"""
+        self._ready.put((index, meta))
+
+    def consume(self, timeout=None):
+        """
+        (index, meta) of the oldest published slot. Raises queue.Empty on timeout.
+        The slot stays held until release(index).
+        """
+        return self._ready.get(timeout=timeout)
+
+    def try_reclaim(self):
+        """
+        Take back the oldest published slot before any consumer reads it
+        (to drop a stale frame). Returns its index or None.
+        """
+        try:
+            index, _ = self._ready.get_nowait()
+        except queue.Empty:
+            return None
+        return index
+
+    def release(self, index):
+        """Return a slot to the free list"""
+        self._free.put(index)
+
+    def close_stream(self, consumers):
+        """Tell each of the consumers that no more frames will be published"""
+        for _ in range(consumers):
+            self._ready.put(None)
+
+    def pending(self):
+        """Number of published slots waiting for a consumer (approximate)"""
+        try:
+            return self._ready.qsize()
+        except NotImplementedError:
+            return 0
+
+    def close(self):
+        """Detach from the shared memory, the creator also frees it"""
+        self._views = None
+        try:
+            self._shm.close()
+        except BufferError:
+            # A caller still holds a slot view, the mapping goes away with it
+            pass
+        if self._owner:
+            self._owner = False
+            self._shm.unlink()
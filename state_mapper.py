@@ -1,45 +1,177 @@
+import os
+import re
+from functools import lru_cache
+
+RTO_CODES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rto_codes.tsv')
+
+# Plate grammar, compiled once. Plates are matched after upper-casing and
+# removing spaces, hyphens and dots.
+# Standard series: state, RTO number, 0-3 series letters, 1-4 digit number (e.g. KA 01 AB 1234)
+STANDARD_PLATE = re.compile(r'([A-Z]{2})(\d{1,2})([A-Z]{0,3})(\d{1,4})')
+# Delhi: RTO number, vehicle category letter, 0-2 series letters, number (e.g. DL 3C AB 1234).
+# Categories: C car, S two-wheeler, E electric, P passenger, R rickshaw, T tourist, V van, Y hire.
+DELHI_PLATE = re.compile(r'DL(\d{1,2})([CSEPRTVY])([A-Z]{0,2})(\d{1,4})')
+# Bharat series: registration year, BH, 4 digit number, 1-2 series letters (e.g. 22 BH 1234 AA)
+BH_PLATE = re.compile(r'(\d{2})BH(\d{4})([A-Z]{1,2})')
+_NOT_ALPHANUMERIC = re.compile(r'[^A-Z0-9]')
+
+# Codes that changed name, for the RTO table lookup
+RTO_ALIASES = {'OR': 'OD', 'TG': 'TS', 'UA': 'UK'}
+
+UNKNOWN = {'state': 'Unknown', 'district': 'Unknown'}
+# District of a valid plate whose RTO code is not in the (partial) RTO table
+UNMAPPED_DISTRICT = 'Unmapped RTO code'
+
+
+def load_rto_codes(path=RTO_CODES_PATH):
+    """Read the RTO code -> district table (tab separated, '#' comments)"""
+    districts = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            code, district = line.split('\t', 1)
+            districts[code] = district
+    return districts
+
+
 class StateMapper:
-    def __init__(self):
-        # Mapping registration codes to locations (simplified example)
-        self.mapping = {
+    """
+    Parses Indian registration numbers and maps them to a state and RTO district.
+
+    Lookups are memoized, so repeated plates (the common case for video and
+    historical reads) cost one dict access. Returned dicts are shared between
+    calls and must not be modified.
+    """
+
+    def __init__(self, rto_codes_path=RTO_CODES_PATH, cache_size=65536):
+        # Registration state codes
+        self.states = {
             # India
-            'AP': {'state': 'Andhra Pradesh', 'district': 'Various'},
-            'AR': {'state': 'Arunachal Pradesh', 'district': 'Various'},
-            'AS': {'state': 'Assam', 'district': 'Various'},
-            'BR': {'state': 'Bihar', 'district': 'Various'},
-            'CG': {'state': 'Chhattisgarh', 'district': 'Various'},
-            'GA': {'state': 'Goa', 'district': 'Various'},
-            'GJ': {'state': 'Gujarat', 'district': 'Various'},
-            'HR': {'state': 'Haryana', 'district': 'Various'},
-            'HP': {'state': 'Himachal Pradesh', 'district': 'Various'},
-            'JK': {'state': 'Jammu and Kashmir', 'district': 'Various'},
-            'JH': {'state': 'Jharkhand', 'district': 'Various'},
-            'KA': {'state': 'Karnataka', 'district': 'Various'},
-            'KL': {'state': 'Kerala', 'district': 'Various'},
-            'MP': {'state': 'Madhya Pradesh', 'district': 'Various'},
-            'MH': {'state': 'Maharashtra', 'district': 'Various'},
-            'MN': {'state': 'Manipur', 'district': 'Various'},
-            'ML': {'state': 'Meghalaya', 'district': 'Various'},
-            'MZ': {'state': 'Mizoram', 'district': 'Various'},
-            'NL': {'state': 'Nagaland', 'district': 'Various'},
-            'OR': {'state': 'Odisha', 'district': 'Various'},
-            'PB': {'state': 'Punjab', 'district': 'Various'},
-            'RJ': {'state': 'Rajasthan', 'district': 'Various'},
-            'SK': {'state': 'Sikkim', 'district': 'Various'},
-            'TN': {'state': 'Tamil Nadu', 'district': 'Various'},
-            'TS': {'state': 'Telangana', 'district': 'Various'},
-            'TR': {'state': 'Tripura', 'district': 'Various'},
-            'UP': {'state': 'Uttar Pradesh', 'district': 'Various'},
-            'UK': {'state': 'Uttarakhand', 'district': 'Various'},
-            'WB': {'state': 'West Bengal', 'district': 'Various'},
-            # Example for other countries
-            'US': {'state': 'United States', 'district': 'Various'},
-            'CA': {'state': 'Canada', 'district': 'Various'},
-            # Add more countries and codes here
+            'AN': 'Andaman and Nicobar Islands',
+            'AP': 'Andhra Pradesh',
+            'AR': 'Arunachal Pradesh',
+            'AS': 'Assam',
+            'BR': 'Bihar',
+            'CG': 'Chhattisgarh',
+            'CH': 'Chandigarh',
+            'DD': 'Dadra and Nagar Haveli and Daman and Diu',
+            'DL': 'Delhi',
+            'DN': 'Dadra and Nagar Haveli and Daman and Diu',
+            'GA': 'Goa',
+            'GJ': 'Gujarat',
+            'HR': 'Haryana',
+            'HP': 'Himachal Pradesh',
+            'JK': 'Jammu and Kashmir',
+            'JH': 'Jharkhand',
+            'KA': 'Karnataka',
+            'KL': 'Kerala',
+            'LA': 'Ladakh',
+            'LD': 'Lakshadweep',
+            'MP': 'Madhya Pradesh',
+            'MH': 'Maharashtra',
+            'MN': 'Manipur',
+            'ML': 'Meghalaya',
+            'MZ': 'Mizoram',
+            'NL': 'Nagaland',
+            'OD': 'Odisha',
+            'OR': 'Odisha',
+            'PB': 'Punjab',
+            'PY': 'Puducherry',
+            'RJ': 'Rajasthan',
+            'SK': 'Sikkim',
+            'TN': 'Tamil Nadu',
+            'TS': 'Telangana',
+            'TG': 'Telangana',
+            'TR': 'Tripura',
+            'UP': 'Uttar Pradesh',
+            'UK': 'Uttarakhand',
+            'UA': 'Uttarakhand',
+            'WB': 'West Bengal',
         }
+        # Prefixes that are not Indian states, only matched on the first two characters
+        self.foreign = {
+            'US': 'United States',
+            'CA': 'Canada',
+        }
+        # RTO code (state + 2 digit number) -> district
+        self.districts = load_rto_codes(rto_codes_path) if rto_codes_path else {}
+        self._lookup = lru_cache(maxsize=cache_size)(self._parse)
 
     def get_location_info(self, reg_code):
-        # Extract state code from plate (first two characters)
-        code = reg_code[:2]
-        return self.mapping.get(code, {'state': 'Unknown', 'district': 'Unknown'})
+        """
+        State and district for a plate, plus the parsed fields when it matches
+        the standard or Bharat (BH) series format (Delhi plates add their 'category' letter).
+        Standard plates carry 'rto_mapped'; when their RTO code is not in the
+        table the district is UNMAPPED_DISTRICT, while plates that do not parse
+        get district 'Unknown'.
+        """
+        if not reg_code:
+            return UNKNOWN
+        return self._lookup(reg_code)
+
+    def bulk_lookup(self, plates):
+        """
+        get_location_info for many plates. Each distinct plate is parsed once,
+        repeats share the result.
+        """
+        plates = list(plates)
+        unique = {plate: self.get_location_info(plate) for plate in dict.fromkeys(plates)}
+        return [unique[plate] for plate in plates]
+
+    def cache_info(self):
+        return self._lookup.cache_info()
+
+    def clear_cache(self):
+        self._lookup.cache_clear()
+
+    def _parse(self, reg_code):
+        plate = _NOT_ALPHANUMERIC.sub('', reg_code.upper())
 
+        match = DELHI_PLATE.fullmatch(plate)
+        if match:
+            rto, category, series, number = match.groups()
+            info = self._standard('DL', rto, series, number)
+            info['category'] = category
+            return info
+
+        match = STANDARD_PLATE.fullmatch(plate)
+        if match and match.group(1) in self.states:
+            return self._standard(*match.groups())
+
+        match = BH_PLATE.fullmatch(plate)
+        if match:
+            year, number, series = match.groups()
+            # Bharat series plates are valid in every state and not tied to an RTO
+            return {
+                'state': 'Bharat (BH) series',
+                'district': 'Any',
+                'format': 'bh',
+                'year': 2000 + int(year),
+                'series': series,
+                'number': number
+            }
+
+        # Not a recognised format, fall back to the first two characters
+        code = plate[:2]
+        state = self.states.get(code) or self.foreign.get(code)
+        if state is None:
+            return UNKNOWN
+        return {'state': state, 'district': 'Unknown', 'format': None, 'state_code': code}
+
+    def _standard(self, state_code, rto, series, number):
+        rto_code = f"{state_code}{int(rto):02d}"
+        district = self.districts.get(rto_code)
+        if district is None and state_code in RTO_ALIASES:
+            district = self.districts.get(f"{RTO_ALIASES[state_code]}{int(rto):02d}")
+        return {
+            'state': self.states[state_code],
+            'district': district or UNMAPPED_DISTRICT,
+            'format': 'standard',
+            'state_code': state_code,
+            'rto_code': rto_code,
+            'rto_mapped': district is not None,
+            'series': series,
+            'number': number
+        }
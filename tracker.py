@@ -0,0 +1,156 @@
+import cv2
+import numpy as np
+from nms import box_overlaps
+
+
+def crop_quality(crop):
+    """Score a plate crop by sharpness (Laplacian variance) weighted by its size"""
+    if crop.size == 0:
+        return 0.0
+    if len(crop.shape) == 3:
+        gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    else:
+        gray = crop
+    sharpness = cv2.Laplacian(gray, cv2.CV_64F).var()
+    return float(sharpness * gray.shape[0] * gray.shape[1])
+
+
+class PlateTrack:
+    """A plate followed across frames, holding its best OCR reading"""
+
+    def __init__(self, track_id, bbox, frame_index):
+        self.track_id = track_id
+        self.bbox = list(bbox)
+        self.first_seen = frame_index
+        self.last_seen = frame_index
+        self.hits = 1
+        self.misses = 0
+
+        # Best OCR reading so far
+        self.text = ''
+        self.text_quality = 0.0
+        self.ocr_quality = None
+        self.last_ocr_frame = None
+
+    @property
+    def centroid(self):
+        x1, y1, x2, y2 = self.bbox
+        return (x1 + x2) / 2.0, (y1 + y2) / 2.0
+
+
+class PlateTracker:
+    """
+    Lightweight multi-object tracker for plate detections.
+    Boxes are associated with existing tracks by IoU first, then by centroid
+    distance, so OCR only has to run when a track needs a (better) reading.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_centroid_distance=0.5, max_misses=15,
+                 ocr_interval=30, quality_gain=1.25, retry_interval=3):
+        self.iou_threshold = iou_threshold
+        # Maximum centroid shift, relative to the track's box diagonal
+        self.max_centroid_distance = max_centroid_distance
+        # Frames a track may go unmatched before it is dropped
+        self.max_misses = max_misses
+        # Re-run OCR on a track at least every this many frames (None disables)
+        self.ocr_interval = ocr_interval
+        # Re-run OCR when crop quality exceeds the last OCR'd crop by this factor
+        self.quality_gain = quality_gain
+        # Retry OCR this often (in frames) while a track has no reading yet
+        self.retry_interval = retry_interval
+
+        self.tracks = {}
+        self.frame_index = -1
+        self._next_id = 1
+
+    def reset(self):
+        self.tracks = {}
+        self.frame_index = -1
+        self._next_id = 1
+
+    def update(self, detections):
+        """
+        Associate this frame's detections with tracks.
+        Sets 'track_id' on every detection and returns the matching tracks in the same order.
+        """
+        self.frame_index += 1
+        tracks = list(self.tracks.values())
+        assigned = [None] * len(detections)
+
+        if tracks and detections:
+            track_boxes = np.array([track.bbox for track in tracks], dtype=np.float64)
+            det_boxes = np.array([det['bbox'] for det in detections], dtype=np.float64)
+
+            # Greedy matching on IoU, best pairs first
+            overlaps = box_overlaps(det_boxes, track_boxes, 'iou')
+            used_tracks = set()
+            for flat in np.argsort(-overlaps, axis=None, kind='stable'):
+                d, t = np.unravel_index(flat, overlaps.shape)
+                if overlaps[d, t] < self.iou_threshold:
+                    break
+                if assigned[d] is None and t not in used_tracks:
+                    assigned[d] = tracks[t]
+                    used_tracks.add(t)
+
+            # Fall back to centroid distance for fast movers that no longer overlap
+            pending = [d for d in range(len(detections)) if assigned[d] is None]
+            free = [t for t in range(len(tracks)) if t not in used_tracks]
+            if pending and free:
+                det_centres = (det_boxes[pending, :2] + det_boxes[pending, 2:]) / 2.0
+                free_boxes = track_boxes[free]
+                track_centres = (free_boxes[:, :2] + free_boxes[:, 2:]) / 2.0
+                diagonals = np.hypot(free_boxes[:, 2] - free_boxes[:, 0],
+                                     free_boxes[:, 3] - free_boxes[:, 1])
+                distances = np.linalg.norm(det_centres[:, None, :] - track_centres[None, :, :], axis=2)
+                distances /= np.maximum(diagonals[None, :], 1.0)
+                for flat in np.argsort(distances, axis=None, kind='stable'):
+                    i, j = np.unravel_index(flat, distances.shape)
+                    if distances[i, j] > self.max_centroid_distance:
+                        break
+                    if assigned[pending[i]] is None and free[j] not in used_tracks:
+                        assigned[pending[i]] = tracks[free[j]]
+                        used_tracks.add(free[j])
+
+        # Update matched tracks and start new ones
+        for i, detection in enumerate(detections):
+            track = assigned[i]
+            if track is None:
+                track = PlateTrack(self._next_id, detection['bbox'], self.frame_index)
+                self.tracks[track.track_id] = track
+                self._next_id += 1
+                assigned[i] = track
+            else:
+                track.bbox = list(detection['bbox'])
+                track.last_seen = self.frame_index
+                track.hits += 1
+                track.misses = 0
+            detection['track_id'] = track.track_id
+
+        # Age out tracks that were not seen this frame
+        for track_id, track in list(self.tracks.items()):
+            if track.last_seen != self.frame_index:
+                track.misses += 1
+                if track.misses > self.max_misses:
+                    del self.tracks[track_id]
+
+        return assigned
+
+    def needs_ocr(self, track, quality):
+        """Decide whether a track's current crop should be sent to OCR"""
+        if track.last_ocr_frame is None:
+            return True
+        if not track.text and self.frame_index - track.last_ocr_frame >= self.retry_interval:
+            return True
+        if track.ocr_quality is not None and quality > track.ocr_quality * self.quality_gain:
+            return True
+        if self.ocr_interval is not None and self.frame_index - track.last_ocr_frame >= self.ocr_interval:
+            return True
+        return False
+
+    def record_text(self, track, text, quality):
+        """Store an OCR result, keeping the reading from the best quality crop"""
+        track.last_ocr_frame = self.frame_index
+        track.ocr_quality = quality
+        if text and (not track.text or quality >= track.text_quality):
+            track.text = text
+            track.text_quality = quality
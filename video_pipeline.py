@@ -0,0 +1,442 @@
+import queue
+import threading
+import time
+from collections import deque
+
+import cv2
+
+from frame_reader import FramePacer, FrameReader
+
+# The process pipeline's dependencies (multiprocessing, shared memory, the detector)
+# are imported where they are used, the thread pipeline does not need them
+
+DROP_POLICIES = ('block', 'drop-oldest', 'latest-wins')
+
+
+class QueueClosed(Exception):
+    """Raised by FrameQueue.get once the queue is closed and drained"""
+
+
+class FrameQueue:
+    """
+    Bounded queue with a drop policy:
+    - 'block': producers wait for space (backpressure)
+    - 'drop-oldest': the oldest item is discarded to make room
+    - 'latest-wins': every put replaces whatever is still queued
+    """
+
+    def __init__(self, maxsize=4, policy='drop-oldest'):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy: {policy}")
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0
+        self.closed = False
+        self._items = deque()
+        self._condition = threading.Condition()
+
+    @property
+    def depth(self):
+        return len(self._items)
+
+    def put(self, item):
+        """Add an item, applying the drop policy. Returns False if the queue is closed."""
+        with self._condition:
+            if self.policy == 'latest-wins':
+                self.dropped += len(self._items)
+                self._items.clear()
+            elif self.policy == 'drop-oldest':
+                while len(self._items) >= self.maxsize:
+                    self._items.popleft()
+                    self.dropped += 1
+            else:
+                while len(self._items) >= self.maxsize and not self.closed:
+                    self._condition.wait()
+
+            if self.closed:
+                return False
+            self._items.append(item)
+            self._condition.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """
+        Remove and return the oldest item.
+        Raises queue.Empty on timeout and QueueClosed once closed and empty.
+        """
+        with self._condition:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not self._items:
+                if self.closed:
+                    raise QueueClosed()
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty()
+                self._condition.wait(remaining)
+            item = self._items.popleft()
+            self._condition.notify_all()
+            return item
+
+    def close(self):
+        """Stop accepting items and wake up every waiting producer and consumer"""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+    def clear(self):
+        with self._condition:
+            self._items.clear()
+            self._condition.notify_all()
+
+
+class VideoPipeline:
+    """
+    Staged video pipeline: decode thread -> detection worker(s) -> consumer (render).
+
+    process(frame) runs on the worker threads and its return value is handed to
+    the consumer through get_result(). Queues between the stages are bounded and
+    decoding is paced from the source FPS, so latency stays flat when detection
+    is slower than the video and nothing is throttled when it is faster.
+
+    stride, start_s and end_s limit decoding to every stride-th frame of a time
+    range (see FrameReader); skipped frames are never decoded.
+    """
+
+    def __init__(self, cap, process, workers=1, frame_queue_size=2, result_queue_size=2,
+                 frame_policy='drop-oldest', result_policy='latest-wins', realtime=True, fps=None,
+                 stride=1, start_s=None, end_s=None):
+        self.cap = cap
+        self.reader = FrameReader.from_time_range(cap, stride, start_s, end_s)
+        self.process = process
+        self.workers = workers
+        # Pace decoding at the source frame rate (False decodes as fast as the workers keep up)
+        self.realtime = realtime
+        self.fps = self.reader.fps if fps is None else fps
+
+        self.frame_queue = FrameQueue(frame_queue_size, frame_policy)
+        self.result_queue = FrameQueue(result_queue_size, result_policy)
+
+        self.frames_decoded = 0
+        self.frames_processed = 0
+        self.stale_results = 0
+        self._last_delivered = -1
+        self._active_workers = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._threads = []
+        self._started_at = None
+
+    def start(self):
+        self._started_at = time.monotonic()
+        self._active_workers = self.workers
+        self._threads = [threading.Thread(target=self._decode_loop, daemon=True)]
+        for _ in range(self.workers):
+            self._threads.append(threading.Thread(target=self._worker_loop, daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=2.0):
+        """Stop all stages and wait for their threads to exit"""
+        self._stop_event.set()
+        self.frame_queue.close()
+        self.result_queue.close()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+
+    @property
+    def finished(self):
+        """True once every frame has been decoded, processed and consumed"""
+        return self.result_queue.closed and self.result_queue.depth == 0
+
+    def get_result(self, timeout=None):
+        """
+        Return the next (source frame index, output) pair, skipping results older than one
+        already delivered. Raises queue.Empty on timeout and QueueClosed when done.
+        """
+        while True:
+            index, output = self.result_queue.get(timeout)
+            if index > self._last_delivered:
+                self._last_delivered = index
+                return index, output
+            self.stale_results += 1
+
+    def stats(self):
+        """Queue depths, dropped-frame counters and throughput"""
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        return {
+            'source_fps': self.reader.source_fps,
+            'frame_stride': self.reader.stride,
+            'frames_decoded': self.frames_decoded,
+            'frames_processed': self.frames_processed,
+            'frame_queue_depth': self.frame_queue.depth,
+            'result_queue_depth': self.result_queue.depth,
+            'dropped_frames': self.frame_queue.dropped,
+            'dropped_results': self.result_queue.dropped + self.stale_results,
+            'processing_fps': self.frames_processed / elapsed if elapsed > 0 else 0.0
+        }
+
+    def _decode_loop(self):
+        pacer = FramePacer(self.fps, self._stop_event)
+        try:
+            while not self._stop_event.is_set() and self.reader.isOpened():
+                if self.realtime and not pacer.wait():
+                    break
+
+                ret, frame = self.reader.read()
+                if not ret:
+                    break
+                self.frames_decoded += 1
+                if not self.frame_queue.put((self.reader.frame_index, frame)):
+                    break
+        finally:
+            self.frame_queue.close()
+
+    def _worker_loop(self):
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    index, frame = self.frame_queue.get()
+                except QueueClosed:
+                    break
+                output = self.process(frame)
+                with self._lock:
+                    self.frames_processed += 1
+                if not self.result_queue.put((index, output)):
+                    break
+        finally:
+            with self._lock:
+                self._active_workers -= 1
+                last_worker = self._active_workers == 0
+            if last_worker:
+                self.result_queue.close()
+
+
+def _decode_process(path, ring, stop_event, counters, workers, stride, start_s, end_s, realtime, fps):
+    """Decoder process: reads frames straight into free ring slots"""
+    cap = cv2.VideoCapture(path)
+    reader = FrameReader.from_time_range(cap, stride, start_s, end_s)
+    pacer = FramePacer(fps or reader.fps, stop_event)
+    try:
+        while not stop_event.is_set() and reader.isOpened():
+            if realtime and not pacer.wait():
+                break
+
+            index = ring.acquire(timeout=0 if realtime else 0.1)
+            if index is None and realtime:
+                # Detection is behind: drop the oldest frame nobody has picked up yet
+                index = ring.try_reclaim()
+                if index is not None:
+                    with counters['dropped'].get_lock():
+                        counters['dropped'].value += 1
+            while index is None and not stop_event.is_set():
+                index = ring.acquire(timeout=0.1)
+            if index is None:
+                break
+
+            view = ring.slot(index)
+            ret, frame = reader.read(view)
+            if ret and frame is not view:
+                # The backend allocated its own buffer (e.g. a resolution change)
+                if frame.shape != view.shape:
+                    ret = False
+                else:
+                    view[...] = frame
+            if not ret:
+                ring.release(index)
+                break
+            with counters['decoded'].get_lock():
+                counters['decoded'].value += 1
+            ring.publish(index, reader.frame_index)
+    finally:
+        reader.release()
+        ring.close_stream(workers)
+        ring.close()
+
+
+def _detect_process(ring, results, stop_event, counters, detector_factory, factory_args):
+    """Detector process: runs detection on ring slots in place and reports the boxes"""
+    if detector_factory is None:
+        from plate_detector import create_detector
+        detector = create_detector(*factory_args, worker=True)
+    else:
+        detector = detector_factory(*factory_args)
+    try:
+        while not stop_event.is_set():
+            try:
+                message = ring.consume(timeout=0.1)
+            except queue.Empty:
+                continue
+            if message is None:
+                break
+            index, frame_index = message
+            detections = detector.detect_plates(ring.slot(index))
+            with counters['processed'].get_lock():
+                counters['processed'].value += 1
+            # The slot stays held until the consumer has rendered it
+            results.put((index, frame_index, detections))
+    finally:
+        results.put(None)
+        ring.close()
+
+
+class ProcessVideoPipeline:
+    """
+    Video pipeline across processes: decoder process -> detector processes -> consumer.
+
+    Frames travel through a SharedFrameRing: the decoder writes each frame into a
+    shared memory slot, detectors read it in place and only slot indices and
+    detection lists are sent between processes. get_result() calls
+    render(frame, detections) on the slot in the consumer's process and then
+    frees the slot, so render must copy anything it keeps (draw_detections does).
+
+    Each detector process sees a subset of the frames, so cross-frame state
+    (tracking, motion gating) is not available here; use VideoPipeline for it.
+    on_detections(frame_index, detections), when given, is called from
+    get_result() for every processed frame, including the ones released
+    unrendered, so consumers that show only the newest frame still see every
+    detection.
+    Detector processes build their detector with
+    plate_detector.create_detector(*factory_args, worker=True) unless a
+    picklable detector_factory is given.
+    Same get_result()/stats()/stop() interface as VideoPipeline.
+    """
+
+    def __init__(self, path, render, workers=2, slots=None, realtime=True, fps=None,
+                 stride=1, start_s=None, end_s=None, detector_factory=None,
+                 factory_args=(), on_detections=None):
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            raise ValueError(f"Cannot open video: {path}")
+        reader = FrameReader.from_time_range(cap, stride, start_s, end_s)
+        shape = (int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), 3)
+        cap.release()
+
+        self.path = path
+        self.render = render
+        self.workers = workers
+        self.realtime = realtime
+        self.source_fps = reader.source_fps
+        self.stride = reader.stride
+        self.fps = reader.fps if fps is None else fps
+        self.sampling = (stride, start_s, end_s)
+        self.detector_factory = detector_factory
+        self.factory_args = factory_args
+        self.on_detections = on_detections
+
+        import multiprocessing
+        from shm_ring import SharedFrameRing
+
+        # Spawn rather than fork: the parent may be running Tk and other threads
+        self._ctx = multiprocessing.get_context('spawn')
+        # One slot being decoded, two per worker (one in detection, one waiting) and one rendering
+        self.ring = SharedFrameRing(shape, slots=slots or 2 * workers + 2, ctx=self._ctx)
+        self._results = self._ctx.Queue()
+        self._stop_event = self._ctx.Event()
+        self._counters = {name: self._ctx.Value('L', 0) for name in ('decoded', 'dropped', 'processed')}
+
+        self.stale_results = 0
+        self._last_delivered = -1
+        self._finished_workers = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._processes = []
+        self._started_at = None
+
+    def start(self):
+        self._started_at = time.monotonic()
+        stride, start_s, end_s = self.sampling
+        self._processes = [self._ctx.Process(
+            target=_decode_process, daemon=True,
+            args=(self.path, self.ring, self._stop_event, self._counters, self.workers,
+                  stride, start_s, end_s, self.realtime, self.fps))]
+        for _ in range(self.workers):
+            self._processes.append(self._ctx.Process(
+                target=_detect_process, daemon=True,
+                args=(self.ring, self._results, self._stop_event, self._counters,
+                      self.detector_factory, self.factory_args)))
+        for process in self._processes:
+            process.start()
+
+    def stop(self, timeout=2.0):
+        """Stop all processes and free the shared memory"""
+        self._stop_event.set()
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self.ring.close()
+
+    @property
+    def finished(self):
+        return self._closed or self._finished_workers == self.workers
+
+    def get_result(self, timeout=None):
+        """
+        Return (source frame index, render output) for the newest processed frame.
+        Older results waiting behind it are released unrendered. Raises
+        queue.Empty on timeout and QueueClosed when done.
+        """
+        with self._lock:
+            if self._closed or self._finished_workers == self.workers:
+                raise QueueClosed()
+            newest = None
+            message = self._next_message(timeout)
+            while True:
+                if message is not None:
+                    index, frame_index, detections = message
+                    if self.on_detections is not None:
+                        self.on_detections(frame_index, detections)
+                    if frame_index <= self._last_delivered:
+                        self.ring.release(index)
+                        self.stale_results += 1
+                    else:
+                        if newest is not None:
+                            self.ring.release(newest[0])
+                            self.stale_results += 1
+                        newest = message
+                try:
+                    message = self._next_message(0)
+                except queue.Empty:
+                    break
+
+            if newest is None:
+                if self._finished_workers == self.workers:
+                    raise QueueClosed()
+                raise queue.Empty()
+
+            index, frame_index, detections = newest
+            try:
+                output = self.render(self.ring.slot(index), detections)
+            finally:
+                self.ring.release(index)
+            self._last_delivered = frame_index
+            return frame_index, output
+
+    def _next_message(self, timeout):
+        # A None from a worker means it has exited
+        message = self._results.get(timeout=timeout)
+        if message is None:
+            self._finished_workers += 1
+        return message
+
+    def stats(self):
+        """Same keys as VideoPipeline.stats()"""
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        processed = self._counters['processed'].value
+        return {
+            'source_fps': self.source_fps,
+            'frame_stride': self.stride,
+            'frames_decoded': self._counters['decoded'].value,
+            'frames_processed': processed,
+            'frame_queue_depth': self.ring.pending(),
+            'result_queue_depth': 0,
+            'dropped_frames': self._counters['dropped'].value,
+            'dropped_results': self.stale_results,
+            'processing_fps': processed / elapsed if elapsed > 0 else 0.0
+        }
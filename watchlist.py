@@ -0,0 +1,213 @@
+import re
+
+# Characters OCR confuses with each other, each group maps to its first character
+CONFUSABLE_GROUPS = ('0ODQ', '1IL', '2Z', '4A', '5S', '6G', '7T', '8B')
+
+# Edit costs: confusable substitutions are cheap, everything else costs 2
+CONFUSABLE_COST = 1
+SUBSTITUTION_COST = 2
+INDEL_COST = 2
+
+_NOT_ALPHANUMERIC = re.compile(r'[^A-Z0-9]')
+_CANONICAL = str.maketrans({char: group[0] for group in CONFUSABLE_GROUPS for char in group[1:]})
+
+
+def normalize_plate(plate):
+    """Upper case without spaces, hyphens and dots"""
+    return _NOT_ALPHANUMERIC.sub('', plate.upper())
+
+
+def canonical(plate):
+    """Normalized plate with every confusable character replaced by its group representative"""
+    return normalize_plate(plate).translate(_CANONICAL)
+
+
+def plate_distance(a, b):
+    """
+    Confusion-aware edit distance between normalized plates: substituting a
+    confusable character (0/O, 1/I, 8/B, ...) costs 1, any other substitution,
+    insertion or deletion costs 2. The result is a metric.
+    """
+    if a == b:
+        return 0
+    ca, cb = a.translate(_CANONICAL), b.translate(_CANONICAL)
+    previous = list(range(0, (len(b) + 1) * INDEL_COST, INDEL_COST))
+    for i in range(1, len(a) + 1):
+        current = [i * INDEL_COST]
+        char, canonical_char = a[i - 1], ca[i - 1]
+        for j in range(1, len(b) + 1):
+            if char == b[j - 1]:
+                substitution = previous[j - 1]
+            elif canonical_char == cb[j - 1]:
+                substitution = previous[j - 1] + CONFUSABLE_COST
+            else:
+                substitution = previous[j - 1] + SUBSTITUTION_COST
+            current.append(min(substitution, previous[j] + INDEL_COST, current[j - 1] + INDEL_COST))
+        previous = current
+    return previous[-1]
+
+
+def _deletions(key):
+    """Every string obtained by deleting one character"""
+    return {key[:i] + key[i + 1:] for i in range(len(key))}
+
+
+# Index values are a single string, or a set once a key has several values.
+# Almost every key has one, and a set per key would triple the memory use.
+
+def _index_add(index, key, value):
+    current = index.get(key)
+    if current is None:
+        index[key] = value
+    elif isinstance(current, set):
+        current.add(value)
+    elif current != value:
+        index[key] = {current, value}
+
+
+def _index_remove(index, key, value):
+    current = index.get(key)
+    if isinstance(current, set):
+        current.discard(value)
+        if len(current) == 1:
+            index[key] = current.pop()
+    elif current == value:
+        del index[key]
+
+
+def _index_get(index, key):
+    current = index.get(key)
+    if current is None:
+        return ()
+    if isinstance(current, set):
+        return current
+    return (current,)
+
+
+class Watchlist:
+    """
+    Fuzzy lookup of plates against a watchlist, tolerant to OCR errors.
+
+    Plates are indexed by their canonical form (confusable characters merged)
+    and by every canonical form with one character deleted. A query only
+    looks up its own canonical form and one-character deletions, then scores
+    the few candidates with plate_distance. Confusable substitutions cost
+    nothing in the index, so any number of them is found, together with up
+    to one other substitution, insertion or deletion. Thresholds are therefore
+    capped at MAX_THRESHOLD (the cost of that one edit plus a confusable one).
+    """
+
+    MAX_THRESHOLD = INDEL_COST + CONFUSABLE_COST
+
+    def __init__(self, plates=None, threshold=2):
+        if not 0 <= threshold <= self.MAX_THRESHOLD:
+            raise ValueError(f"threshold must be between 0 and {self.MAX_THRESHOLD}")
+        # Default maximum distance for match() and query()
+        self.threshold = threshold
+        # Normalized plate -> note
+        self.entries = {}
+        # Canonical form -> normalized plate(s)
+        self._canonical = {}
+        # Canonical form with one character deleted -> canonical form(s)
+        self._deletions = {}
+        for plate in plates or ():
+            self.add(plate)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, plate):
+        return normalize_plate(plate) in self.entries
+
+    def add(self, plate, note=None):
+        """Add a plate (or update its note). Returns the normalized plate."""
+        plate = normalize_plate(plate)
+        if not plate:
+            raise ValueError("Empty plate")
+        if plate not in self.entries:
+            key = plate.translate(_CANONICAL)
+            if key not in self._canonical:
+                for deletion in _deletions(key):
+                    _index_add(self._deletions, deletion, key)
+            _index_add(self._canonical, key, plate)
+        self.entries[plate] = note
+        return plate
+
+    def remove(self, plate):
+        """Remove a plate, returns False if it was not on the list"""
+        plate = normalize_plate(plate)
+        if plate not in self.entries:
+            return False
+        del self.entries[plate]
+        key = plate.translate(_CANONICAL)
+        _index_remove(self._canonical, key, plate)
+        if key not in self._canonical:
+            for deletion in _deletions(key):
+                _index_remove(self._deletions, deletion, key)
+        return True
+
+    def clear(self):
+        self.entries.clear()
+        self._canonical.clear()
+        self._deletions.clear()
+
+    def query(self, plate, threshold=None):
+        """(plate, distance) pairs within threshold, closest first"""
+        threshold = self.threshold if threshold is None else min(threshold, self.MAX_THRESHOLD)
+        plate = normalize_plate(plate)
+        if not plate:
+            return []
+
+        hits = []
+        for candidate in self._candidates(plate, threshold):
+            distance = plate_distance(plate, candidate)
+            if distance <= threshold:
+                hits.append((candidate, distance))
+        hits.sort(key=lambda hit: (hit[1], hit[0]))
+        return hits
+
+    def nearest(self, plate, k=1):
+        """The k closest plates within MAX_THRESHOLD"""
+        return self.query(plate, self.MAX_THRESHOLD)[:k]
+
+    def match(self, plate):
+        """Best (plate, distance) within the threshold, or None"""
+        plate = normalize_plate(plate)
+        # Fast path: exact hit
+        if plate in self.entries:
+            return plate, 0
+        hits = self.query(plate)
+        return hits[0] if hits else None
+
+    def _candidates(self, plate, threshold):
+        key = plate.translate(_CANONICAL)
+        candidates = set(_index_get(self._canonical, key))
+        if threshold < min(INDEL_COST, SUBSTITUTION_COST):
+            # Only confusable substitutions fit, they share the canonical form
+            return candidates
+
+        keys = set(_index_get(self._deletions, key))  # one insertion in the query
+        for deletion in _deletions(key):
+            if deletion in self._canonical:  # one deletion in the query
+                keys.add(deletion)
+            keys.update(_index_get(self._deletions, deletion))  # one substitution
+        for other in keys:
+            candidates.update(_index_get(self._canonical, other))
+        return candidates
+
+    def load(self, path):
+        """
+        Add plates from a text file, one per line as 'plate' or 'plate,note'.
+        Blank lines and lines starting with '#' are skipped. Returns the number added.
+        """
+        added = 0
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                plate, _, note = line.partition(',')
+                if normalize_plate(plate):
+                    self.add(plate, note.strip() or None)
+                    added += 1
+        return added